@@ -0,0 +1,557 @@
+"""Sentiment and keyword analysis core of MoodLens.
+
+Everything needed to score journal text lives here, free of Streamlit,
+Plotly and pandas, so the app, the command-line scorer and the HTTP batch
+endpoint (score_service.py) share one implementation and importing it has
+no UI side effects. numpy is only imported by the vectorized classifiers
+and the VADER lexicon is loaded on first use, then shared process-wide.
+"""
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    from importlib.metadata import version as package_version
+    VADER_AVAILABLE = True
+    VADER_VERSION = package_version('vaderSentiment')
+except ImportError:
+    VADER_VERSION = None
+    VADER_AVAILABLE = False
+
+# Emotion tiers by compound score, checked in order; anything in between is Neutral
+POSITIVE_EMOTIONS = (('Very Positive', 0.75), ('Positive', 0.1))
+NEGATIVE_EMOTIONS = (('Very Negative', -0.75), ('Negative', -0.1))
+
+# Looser cut-off used for mood badges, gratitude highlights and the positive ratio
+MOOD_THRESHOLD = 0.05
+
+NEUTRAL_SENTIMENT = {
+    'compound': 0.0,
+    'pos': 0.33,
+    'neu': 0.34,
+    'neg': 0.33,
+    'emotion': 'Neutral'
+}
+
+# Batches smaller than this are scored in-process; forking workers costs more than it saves
+PARALLEL_BATCH_THRESHOLD = 2000
+BATCH_CHUNK_SIZE = 500
+
+# Entries of at least this many words are scored sentence by sentence and averaged
+SEGMENTED_MIN_WORDS = int(os.environ.get('MOODLENS_SEGMENTED_MIN_WORDS', '150'))
+
+# Paragraphs are separated by blank lines; sentences end at terminal punctuation or a line break
+PARAGRAPH_PATTERN = re.compile(r'\S.*?(?=\n[^\S\n]*\n|\Z)', re.S)
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?]+[\'"”’)\]]*(?=\s|\Z)|(?=\n)|\Z)', re.S)
+
+# Threads analyzing entries saved with background analysis switched on
+ANALYSIS_WORKERS = int(os.environ.get('MOODLENS_ANALYSIS_WORKERS', '2'))
+
+_analyzer = None
+_analyzer_load_seconds = 0.0
+_analysis_cache = None
+_background_analyzer = None
+_singleton_lock = threading.Lock()
+
+
+def get_analyzer():
+    """(analyzer, load seconds) of the VADER analyzer, built once per process on first use"""
+    global _analyzer, _analyzer_load_seconds
+    if _analyzer is None:
+        with _singleton_lock:
+            if _analyzer is None:
+                start = time.perf_counter()
+                analyzer = SentimentIntensityAnalyzer()
+                _analyzer_load_seconds = time.perf_counter() - start
+                _analyzer = analyzer
+    return _analyzer, _analyzer_load_seconds
+
+
+def score_text(analyzer, text):
+    """Score one text with the given analyzer and attach the emotion label"""
+    if analyzer is None or not text.strip():
+        return dict(NEUTRAL_SENTIMENT)
+
+    scores = analyzer.polarity_scores(text)
+
+    scores['emotion'] = classify_emotion(scores['compound'])
+    return scores
+
+
+def classify_emotion(compound):
+    """Map a single compound score to its emotion tier"""
+    for emotion, threshold in POSITIVE_EMOTIONS:
+        if compound >= threshold:
+            return emotion
+    for emotion, threshold in NEGATIVE_EMOTIONS:
+        if compound <= threshold:
+            return emotion
+    return 'Neutral'
+
+
+def classify_emotions(compounds):
+    """Map a whole column of compound scores to emotion tiers at once"""
+    import numpy as np
+    compounds = np.asarray(compounds, dtype=float)
+    conditions = [compounds >= threshold for _, threshold in POSITIVE_EMOTIONS]
+    conditions += [compounds <= threshold for _, threshold in NEGATIVE_EMOTIONS]
+    labels = [emotion for emotion, _ in POSITIVE_EMOTIONS + NEGATIVE_EMOTIONS]
+    return np.select(conditions, labels, default='Neutral')
+
+
+def classify_mood(compound):
+    """Map a single compound score to 'positive', 'neutral' or 'negative'"""
+    if compound > MOOD_THRESHOLD:
+        return 'positive'
+    if compound < -MOOD_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def classify_moods(compounds):
+    """Map a whole column of compound scores to moods at once"""
+    import numpy as np
+    compounds = np.asarray(compounds, dtype=float)
+    return np.select(
+        [compounds > MOOD_THRESHOLD, compounds < -MOOD_THRESHOLD],
+        ['positive', 'negative'],
+        default='neutral'
+    )
+
+
+def analyze_sentiment(text):
+    """Analyze sentiment using VADER"""
+    if is_long_entry(text):
+        return analyze_segments(text)['sentiment']
+    cache = get_analysis_cache()
+    scores = cache.get('sentiment', text)
+    if scores is None:
+        analyzer = get_analyzer()[0] if VADER_AVAILABLE else None
+        scores = score_text(analyzer, text)
+        cache.put('sentiment', text, scores)
+    return scores
+
+
+def _score_chunk(texts):
+    """Score a chunk of texts inside a forked pool worker with the analyzer it inherited"""
+    return [score_text(_analyzer, text) for text in texts]
+
+
+def analyze_sentiment_batch(texts, workers=None):
+    """Analyze many texts at once, in input order, scoring each distinct uncached text only once
+
+    workers > 1 scores large batches on a forked process pool; leave it
+    unset in any multi-threaded process (see _score_texts).
+    """
+    results = []
+    for text, spans, scores in _score_segmented(texts, workers=workers):
+        results.append(scores[0] if spans is None else aggregate_sentiment(text, spans, scores))
+    return results
+
+
+def is_long_entry(text):
+    """Whether a text is long enough to be scored by segments"""
+    return len(text.split()) >= SEGMENTED_MIN_WORDS
+
+
+def split_segments(text):
+    """(paragraph, start, end) character spans of the sentences of a text, in order"""
+    spans = []
+    for paragraph, block in enumerate(PARAGRAPH_PATTERN.finditer(text)):
+        for sentence in SENTENCE_PATTERN.finditer(text, block.start(), block.end()):
+            spans.append((paragraph, sentence.start(), sentence.end()))
+    return spans
+
+
+def _score_segmented(texts, long_only=True, workers=None):
+    """(text, spans, scores) per text, scoring all whole texts and segments in one cached batch
+
+    Long texts (every text when long_only is False) get their sentence spans
+    and one score per sentence; the rest get spans None and a single score.
+    Sentences are cached like any text, so an edit re-scores only what changed.
+    """
+    plans = []
+    requests = []
+    for text in texts:
+        spans = split_segments(text) if not long_only or is_long_entry(text) else None
+        if spans is not None and not spans:
+            spans = None
+        plans.append((text, spans, len(requests)))
+        if spans is None:
+            requests.append(text)
+        else:
+            requests.extend(text[start:end] for _, start, end in spans)
+
+    scores = get_analysis_cache().get_or_compute_many(
+        'sentiment', requests, lambda missing: _score_texts(missing, workers)
+    )
+    return [
+        (text, spans, scores[offset:offset + (1 if spans is None else len(spans))])
+        for text, spans, offset in plans
+    ]
+
+
+def aggregate_sentiment(text, spans, scores):
+    """Word-weighted average of segment scores, so every sentence counts by its length"""
+    weights = [max(len(text[start:end].split()), 1) for _, start, end in spans]
+    total = sum(weights)
+    sentiment = {
+        name: round(sum(weight * score[name] for weight, score in zip(weights, scores)) / total, digits)
+        for name, digits in (('compound', 4), ('pos', 3), ('neu', 3), ('neg', 3))
+    }
+    sentiment['emotion'] = classify_emotion(sentiment['compound'])
+    return sentiment
+
+
+def analyze_segments(text):
+    """Aggregate sentiment of a text plus its sentence-by-sentence emotion timeline
+
+    Returns {'sentiment': ..., 'segments': [...]}; each segment carries its
+    paragraph number, character span, text, compound score and emotion.
+    """
+    text, spans, scores = _score_segmented([text], long_only=False)[0]
+    if spans is None:
+        return {'sentiment': scores[0], 'segments': []}
+    segments = [
+        {
+            'paragraph': paragraph,
+            'start': start,
+            'end': end,
+            'text': text[start:end],
+            'compound': score['compound'],
+            'emotion': score['emotion']
+        }
+        for (paragraph, start, end), score in zip(spans, scores)
+    ]
+    return {'sentiment': aggregate_sentiment(text, spans, scores), 'segments': segments}
+
+
+def _score_texts(texts, workers=None):
+    """Score texts without the cache, in-process unless workers > 1 asks for a process pool on large batches
+
+    The pool is forked, so only single-threaded callers such as the score
+    command line may ask for it: forking the Streamlit server or the HTTP
+    endpoint would copy their threads' locks and connections into workers.
+    """
+    analyzer = get_analyzer()[0] if VADER_AVAILABLE else None
+    use_pool = (
+        VADER_AVAILABLE
+        and workers is not None
+        and workers > 1
+        and len(texts) >= PARALLEL_BATCH_THRESHOLD
+        and 'fork' in multiprocessing.get_all_start_methods()
+    )
+    if not use_pool:
+        return [score_text(analyzer, text) for text in texts]
+
+    chunks = [texts[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(texts), BATCH_CHUNK_SIZE)]
+    results = []
+    # Fork after the analyzer is built so every worker inherits it instead of re-parsing the lexicon
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        for chunk_scores in pool.map(_score_chunk, chunks):
+            results.extend(chunk_scores)
+    return results
+
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you',
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
+    'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
+    'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
+    'that', 'am', 'been', 'being', 'so', 'than', 'too', 'very', 'just',
+    'dont', 'now', 'then', 'once', 'here', 'there', 'when', 'where', 'why',
+    'how', 'all', 'both', 'each', 'few', 'more', 'most', 'other', 'some',
+    'such', 'only', 'own', 'same', 'than', 'into', 'through', 'during',
+    'before', 'after', 'above', 'below', 'between', 'under', 'again',
+    'further', 'up', 'down', 'out', 'off', 'over', 'until', 'while',
+    'about', 'get', 'got', 'like', 'really', 'also', 'today', 'day'
+})
+
+
+class KeywordExtractor:
+    """Frequency-based keyword extractor with a frozen stopword set and precompiled tokenizer"""
+
+    # Extract words (preserve emotions and meaningful terms)
+    TOKEN_PATTERN = re.compile(r'\b[a-zA-Z][a-zA-Z\-]*\b')
+
+    def __init__(self, stop_words=None, extra_stop_words=(), min_length=4):
+        base = STOP_WORDS if stop_words is None else stop_words
+        self.stop_words = frozenset(w.lower() for w in base) | frozenset(w.lower() for w in extra_stop_words)
+        self.min_length = min_length
+
+    def tokenize(self, text):
+        """Split text into lowercase word tokens"""
+        return self.TOKEN_PATTERN.findall(text.lower())
+
+    def candidates(self, text):
+        """Tokens that survive stopword and length filtering, in order of appearance"""
+        stop_words = self.stop_words
+        min_length = self.min_length
+        return [
+            w for w in self.tokenize(text)
+            if w not in stop_words
+            and len(w) >= min_length
+            and not w.isdigit()
+        ]
+
+    def extract(self, text, top_n=10):
+        """Most frequent keywords in a single text"""
+        word_freq = Counter(self.candidates(text))
+        return [word for word, count in word_freq.most_common(top_n)]
+
+    def extract_batch(self, texts, top_n=10):
+        """Most frequent keywords for each text, in input order"""
+        findall = self.TOKEN_PATTERN.findall
+        stop_words = self.stop_words
+        min_length = self.min_length
+        results = []
+        for text in texts:
+            word_freq = Counter(
+                w for w in findall(text.lower())
+                if w not in stop_words and len(w) >= min_length and not w.isdigit()
+            )
+            results.append([word for word, count in word_freq.most_common(top_n)])
+        return results
+
+
+DEFAULT_KEYWORD_EXTRACTOR = KeywordExtractor()
+
+
+def extract_keywords(text, top_n=10):
+    """Extract meaningful keywords from text"""
+    cache = get_analysis_cache()
+    kind = f'keywords{top_n}'
+    keywords = cache.get(kind, text)
+    if keywords is None:
+        keywords = DEFAULT_KEYWORD_EXTRACTOR.extract(text, top_n)
+        cache.put(kind, text, keywords)
+    return keywords
+
+
+def extract_keywords_batch(texts, top_n=10):
+    """Extract keywords for many texts at once, in input order, through the analysis cache"""
+    return get_analysis_cache().get_or_compute_many(
+        f'keywords{top_n}', texts, lambda missing: DEFAULT_KEYWORD_EXTRACTOR.extract_batch(missing, top_n)
+    )
+
+
+ANALYSIS_CACHE_SIZE = 50000
+
+# Set to a file path to keep analysis results across server restarts
+ANALYSIS_CACHE_PATH = os.environ.get('MOODLENS_ANALYSIS_CACHE')
+
+
+class AnalysisCache:
+    """Size-bounded LRU of analysis results keyed by a hash of the normalized text"""
+
+    def __init__(self, max_entries=ANALYSIS_CACHE_SIZE, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, text):
+        # VADER and the keyword tokenizer both split on whitespace, so collapsing it never changes a result
+        normalized = ' '.join(text.split())
+        return kind + ':' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def validate(self, fingerprint):
+        """Drop every result computed under a different analyzer version, threshold table or keyword rule"""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self._items.clear()
+                self.fingerprint = fingerprint
+
+    def get(self, kind, text):
+        """Copy of a cached result, or None"""
+        key = self.key(kind, text)
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value.copy()
+
+    def put(self, kind, text, value):
+        """Store a copy of a result, evicting the least recently used ones beyond max_entries"""
+        key = self.key(kind, text)
+        with self._lock:
+            self._store(key, value.copy())
+
+    def _store(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute_many(self, kind, texts, compute):
+        """Results for many texts in input order; compute(list_of_texts) runs once for the distinct misses"""
+        texts = list(texts)
+        keys = [self.key(kind, text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._items.get(key)
+                if value is None:
+                    self.misses += 1
+                    missing.setdefault(key, texts[i])
+                else:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    results[i] = value.copy()
+
+        if missing:
+            computed = dict(zip(missing, compute(list(missing.values()))))
+            with self._lock:
+                for key, value in computed.items():
+                    self._store(key, value.copy())
+            for i, key in enumerate(keys):
+                if results[i] is None:
+                    results[i] = computed[key].copy()
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def load(self):
+        """Restore results saved under the current fingerprint, if any"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as cache_file:
+            saved = json.load(cache_file)
+        if saved.get('fingerprint') != self.fingerprint:
+            return
+        with self._lock:
+            for key, value in saved['items']:
+                self._store(key, value)
+
+    def save(self):
+        """Write the cache to its path, replacing the previous file atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            saved = {'fingerprint': self.fingerprint, 'items': list(self._items.items())}
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(saved, cache_file)
+        os.replace(temp_path, self.path)
+
+
+def analysis_fingerprint():
+    """Identity of everything a cached result depends on"""
+    parts = (
+        VADER_VERSION,
+        POSITIVE_EMOTIONS,
+        NEGATIVE_EMOTIONS,
+        KeywordExtractor.TOKEN_PATTERN.pattern,
+        sorted(DEFAULT_KEYWORD_EXTRACTOR.stop_words),
+        DEFAULT_KEYWORD_EXTRACTOR.min_length
+    )
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def get_analysis_cache():
+    """Process-wide analysis cache, restored from disk when MOODLENS_ANALYSIS_CACHE is set"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _singleton_lock:
+            if _analysis_cache is None:
+                cache = AnalysisCache(path=ANALYSIS_CACHE_PATH)
+                cache.validate(analysis_fingerprint())
+                cache.load()
+                atexit.register(cache.save)
+                _analysis_cache = cache
+    return _analysis_cache
+
+
+def analyze_entry(text):
+    """Sentiment and keywords of one text, in the shape a journal entry stores them"""
+    return {'sentiment': analyze_sentiment(text), 'keywords': extract_keywords(text)}
+
+
+def analyze_entries(texts, workers=None):
+    """analyze_entry for many texts at once, in input order; workers as for analyze_sentiment_batch"""
+    texts = list(texts)
+    return [
+        {'sentiment': sentiment, 'keywords': keywords}
+        for sentiment, keywords in zip(analyze_sentiment_batch(texts, workers), extract_keywords_batch(texts))
+    ]
+
+
+class BackgroundAnalyzer:
+    """Thread pool running analyze_entry off the request path, with queue and latency metrics"""
+
+    def __init__(self, workers=ANALYSIS_WORKERS, history=200):
+        self.workers = workers
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self._latencies = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='moodlens-analysis')
+
+    def submit(self, text):
+        """Future of analyze_entry(text)"""
+        with self._lock:
+            self.submitted += 1
+        return self._pool.submit(self._run, text, time.perf_counter())
+
+    def _run(self, text, submitted_at):
+        with self._lock:
+            self.started += 1
+        try:
+            return analyze_entry(text)
+        finally:
+            with self._lock:
+                self.completed += 1
+                self._latencies.append(time.perf_counter() - submitted_at)
+
+    def stats(self):
+        """Worker count, queue depth and time from submission to result over the latest analyses"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'workers': self.workers,
+                'queued': self.submitted - self.started,
+                'running': self.started - self.completed,
+                'completed': self.completed,
+                'mean_seconds': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p95_seconds': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+            }
+
+
+def get_background_analyzer():
+    """Process-wide BackgroundAnalyzer, started on first use"""
+    global _background_analyzer
+    if _background_analyzer is None:
+        with _singleton_lock:
+            if _background_analyzer is None:
+                _background_analyzer = BackgroundAnalyzer()
+    return _background_analyzer
@@ -1,13 +1,37 @@
 import streamlit as st
-import json
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
-import re
-from collections import Counter
-import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 import plotly.express as px
 import pytz
 
+from analysis import (
+    DEFAULT_KEYWORD_EXTRACTOR,
+    MOOD_THRESHOLD,
+    VADER_AVAILABLE,
+    analyze_entry,
+    analyze_segments,
+    analyze_sentiment,
+    analyze_sentiment_batch,
+    classify_emotions,
+    classify_mood,
+    classify_moods,
+    extract_keywords,
+    extract_keywords_batch,
+    get_analysis_cache,
+    get_analyzer,
+    get_background_analyzer,
+    is_long_entry
+)
+from journal import EMOTION_LABELS, Journal
+from storage import JournalStore
+from journal_io import EXPORT_FORMATS, PARQUET_AVAILABLE, JournalImport, entry_key, export_to_tempfile
+from journal_io import CHUNK_SIZE as EXPORT_CHUNK_SIZE
+from search import SearchIndex
+
 # =============================================================================
 # BRANDING - MoodLens
 # =============================================================================
@@ -17,12 +41,7 @@ APP_ICON = "🔍"
 APP_VERSION = "1.0.0"
 # =============================================================================
 
-# Try importing sentiment analysis libraries
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-    VADER_AVAILABLE = True
-except ImportError:
-    VADER_AVAILABLE = False
+if not VADER_AVAILABLE:
     st.warning("Run: pip install vaderSentiment")
 
 # Page configuration
@@ -347,79 +366,36 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Initialize session state for storing entries
-if 'entries' not in st.session_state:
-    st.session_state.entries = []
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """Open the journal database once per process and share it across sessions"""
+    return JournalStore()
 
-if 'show_prompt' not in st.session_state:
-    st.session_state.show_prompt = False
 
+# Warm up the shared analyzer on the first script run so no save pays for the lexicon load
+if VADER_AVAILABLE:
+    get_analyzer()
 
-def analyze_sentiment(text):
-    """Analyze sentiment using VADER"""
-    if not VADER_AVAILABLE or not text.strip():
-        return {
-            'compound': 0.0,
-            'pos': 0.33,
-            'neu': 0.34,
-            'neg': 0.33,
-            'emotion': 'Neutral'
-        }
-    
-    analyzer = SentimentIntensityAnalyzer()
-    scores = analyzer.polarity_scores(text)
-    
-    # Determine emotion
-    compound = scores['compound']
-    if compound >= 0.75:
-        emotion = 'Very Positive'
-    elif compound >= 0.1:
-        emotion = 'Positive'
-    elif compound <= -0.75:
-        emotion = 'Very Negative'
-    elif compound <= -0.1:
-        emotion = 'Negative'
-    else:
-        emotion = 'Neutral'
-    
-    scores['emotion'] = emotion
-    return scores
-
-
-def extract_keywords(text, top_n=10):
-    """Extract meaningful keywords from text"""
-    stop_words = {
-        'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-        'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
-        'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-        'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
-        'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you',
-        'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
-        'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
-        'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
-        'that', 'am', 'been', 'being', 'so', 'than', 'too', 'very', 'just',
-        'dont', 'now', 'then', 'once', 'here', 'there', 'when', 'where', 'why',
-        'how', 'all', 'both', 'each', 'few', 'more', 'most', 'other', 'some',
-        'such', 'only', 'own', 'same', 'than', 'into', 'through', 'during',
-        'before', 'after', 'above', 'below', 'between', 'under', 'again',
-        'further', 'up', 'down', 'out', 'off', 'over', 'until', 'while',
-        'about', 'get', 'got', 'like', 'really', 'also', 'today', 'day'
-    }
-    
-    # Extract words (preserve emotions and meaningful terms)
-    words = re.findall(r'\b[a-zA-Z][a-zA-Z\-]*\b', text.lower())
-    
-    # Filter words
-    keywords = [
-        w for w in words 
-        if w not in stop_words 
-        and len(w) > 3 
-        and not w.isdigit()
-    ]
-    
-    # Count frequency
-    word_freq = Counter(keywords)
-    return [word for word, count in word_freq.most_common(top_n)]
+
+# Entries are stamped with Toronto wall-clock time, so "today" must be the Toronto date too
+ENTRY_TIMEZONE = pytz.timezone('America/Toronto')
+
+
+def entry_now():
+    """Current time in the timezone entries are stamped in"""
+    return pytz.UTC.localize(datetime.utcnow()).astimezone(ENTRY_TIMEZONE)
+
+
+def entry_today():
+    """Today's date in the timezone entries are stamped in, whatever the server's own timezone"""
+    return entry_now().date()
+
+
+MOOD_BADGES = {
+    'positive': ('positive-badge', '😊'),
+    'neutral': ('neutral-badge', '😐'),
+    'negative': ('negative-badge', '😔')
+}
 
 
 def get_writing_prompt():
@@ -451,24 +427,124 @@ def get_writing_prompt():
     return random.choice(prompts)
 
 
-def create_sentiment_chart(entries_df):
-    """Create sentiment trend chart"""
+CHART_TEXT_COLOR = "#1e293b"
+
+EMOTION_COLORS = {
+    'Very Positive': '#10b981',
+    'Positive': '#34d399',
+    'Neutral': '#f59e0b',
+    'Negative': '#f87171',
+    'Very Negative': '#ef4444'
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_chart_template():
+    """Shared MoodLens look for every chart, built once per process on top of plotly_white"""
+    template = go.layout.Template(pio.templates['plotly_white'])
+    axis = dict(
+        title_font=dict(color=CHART_TEXT_COLOR),
+        tickfont=dict(color=CHART_TEXT_COLOR)
+    )
+    template.layout.update(
+        font=dict(family="Inter, sans-serif", size=12, color=CHART_TEXT_COLOR),
+        title_font=dict(size=18, family="Inter, sans-serif", color=CHART_TEXT_COLOR),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        xaxis=axis,
+        yaxis=axis,
+        legend=dict(
+            font=dict(color=CHART_TEXT_COLOR)
+        )
+    )
+    return template
+
+
+# Above this many entries the trend chart shows per-period means instead of every entry
+SENTIMENT_CHART_MAX_POINTS = 1500
+
+# Finest resolution whose bucket count fits under SENTIMENT_CHART_MAX_POINTS wins
+SENTIMENT_RESOLUTIONS = (('Daily', 'D'), ('Weekly', 'W'), ('Monthly', 'MS'))
+
+# Traces with more points than this are drawn with WebGL
+WEBGL_POINT_THRESHOLD = 1000
+
+
+def resample_sentiment(entries_df, max_points=SENTIMENT_CHART_MAX_POINTS):
+    """Per-period mean/min/max/count of compound scores at the finest resolution that fits
+    in max_points, or None when the entries fit as they are"""
+    if len(entries_df) <= max_points:
+        return None
+    
+    series = entries_df.set_index('date')['compound']
+    for label, rule in SENTIMENT_RESOLUTIONS:
+        resampled = series.resample(rule).agg(['mean', 'min', 'max', 'count'])
+        resampled = resampled[resampled['count'] > 0]
+        if len(resampled) <= max_points:
+            break
+    return label, resampled.reset_index()
+
+
+def create_sentiment_chart(entries_df, max_points=SENTIMENT_CHART_MAX_POINTS):
+    """Create sentiment trend chart, downsampled to period means with a min/max band for long histories"""
     if entries_df.empty:
         return None
     
     fig = go.Figure()
+    resampled = resample_sentiment(entries_df, max_points)
     
-    # Add sentiment line
-    fig.add_trace(go.Scatter(
-        x=entries_df['date'],
-        y=entries_df['compound'],
-        mode='lines+markers',
-        name='Sentiment',
-        line=dict(color='#667eea', width=3),
-        marker=dict(size=8),
-        fill='tozeroy',
-        fillcolor='rgba(102, 126, 234, 0.1)'
-    ))
+    if resampled is None:
+        scatter = go.Scattergl if len(entries_df) > WEBGL_POINT_THRESHOLD else go.Scatter
+        title = "Your Emotional Journey Over Time"
+        
+        # Add sentiment line
+        fig.add_trace(scatter(
+            x=entries_df['date'],
+            y=entries_df['compound'],
+            mode='lines+markers',
+            name='Sentiment',
+            line=dict(color='#667eea', width=3),
+            marker=dict(size=8),
+            fill='tozeroy',
+            fillcolor='rgba(102, 126, 234, 0.1)'
+        ))
+    else:
+        resolution, periods = resampled
+        scatter = go.Scattergl if len(periods) > WEBGL_POINT_THRESHOLD else go.Scatter
+        title = f"Your Emotional Journey Over Time ({resolution.lower()} average)"
+        
+        # Min/max band: the lower edge fills up to the upper one
+        fig.add_trace(scatter(
+            x=periods['date'],
+            y=periods['max'],
+            mode='lines',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(scatter(
+            x=periods['date'],
+            y=periods['min'],
+            mode='lines',
+            name='Range',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor='rgba(102, 126, 234, 0.15)',
+            hoverinfo='skip'
+        ))
+        fig.add_trace(scatter(
+            x=periods['date'],
+            y=periods['mean'],
+            mode='lines+markers' if len(periods) <= 200 else 'lines',
+            name=f'{resolution} average',
+            line=dict(color='#667eea', width=3),
+            marker=dict(size=6),
+            customdata=periods[['min', 'max', 'count']].to_numpy(),
+            hovertemplate=(
+                '%{y:.2f} (range %{customdata[0]:.2f} to %{customdata[1]:.2f}, '
+                '%{customdata[2]} entries)<extra></extra>'
+            )
+        ))
     
     # Add reference lines
     fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
@@ -476,29 +552,79 @@ def create_sentiment_chart(entries_df):
     fig.add_hline(y=-0.5, line_dash="dot", line_color="red", opacity=0.3)
     
     fig.update_layout(
-        title="Your Emotional Journey Over Time",
+        title=title,
         xaxis_title="Date",
         yaxis_title="Sentiment Score",
         hovermode='x unified',
-        template='plotly_white',
-        height=400,
-        font=dict(family="Inter, sans-serif", size=12, color="#1e293b"),
-        title_font=dict(size=18, family="Inter, sans-serif", color="#1e293b"),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(
-            title_font=dict(color="#1e293b"),
-            tickfont=dict(color="#1e293b")
-        ),
-        yaxis=dict(
-            title_font=dict(color="#1e293b"),
-            tickfont=dict(color="#1e293b")
+        template=get_chart_template(),
+        height=400
+    )
+    
+    return fig
+
+
+def create_segment_timeline(segments):
+    """Create the sentence-by-sentence emotion timeline of one long entry"""
+    if not segments:
+        return None
+    
+    scatter = go.Scattergl if len(segments) > WEBGL_POINT_THRESHOLD else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=list(range(1, len(segments) + 1)),
+        y=[segment['compound'] for segment in segments],
+        mode='lines+markers',
+        name='Sentence',
+        line=dict(color='#667eea', width=2),
+        marker=dict(size=8, color=[EMOTION_COLORS[segment['emotion']] for segment in segments]),
+        customdata=[
+            (segment['paragraph'] + 1, segment['emotion'], segment['text'][:80])
+            for segment in segments
+        ],
+        hovertemplate=(
+            'Paragraph %{customdata[0]} · %{customdata[1]} (%{y:.2f})<br>'
+            '%{customdata[2]}<extra></extra>'
+        )
+    ))
+    
+    # Zero line plus a mark where each paragraph after the first begins, set as one shape list
+    # because add_hline/add_vline validate the whole layout on every call
+    shapes = [dict(
+        type='line', xref='paper', x0=0, x1=1, y0=0, y1=0,
+        line=dict(dash='dash', color='gray'), opacity=0.5
+    )]
+    shapes += [
+        dict(
+            type='line', yref='paper', x0=i + 0.5, x1=i + 0.5, y0=0, y1=1,
+            line=dict(dash='dot', color='gray'), opacity=0.4
         )
+        for i in range(1, len(segments))
+        if segments[i]['paragraph'] != segments[i - 1]['paragraph']
+    ]
+    
+    fig.update_layout(
+        shapes=shapes,
+        title="Emotion Timeline of This Entry",
+        xaxis_title="Sentence",
+        yaxis_title="Sentiment Score",
+        yaxis_range=[-1.05, 1.05],
+        template=get_chart_template(),
+        height=320
     )
     
     return fig
 
 
+def chart_payload_size(journal, name, *params):
+    """Bytes of JSON the browser receives for one cached chart"""
+    return cached_for_version(
+        journal,
+        ('chart-size', name),
+        lambda j: len(pio.to_json(get_chart(j, name, *params), validate=False)),
+        params
+    )
+
+
 def create_emotion_distribution(entries_df):
     """Create emotion distribution pie chart"""
     if entries_df.empty:
@@ -506,18 +632,10 @@ def create_emotion_distribution(entries_df):
     
     emotion_counts = entries_df['emotion'].value_counts()
     
-    colors = {
-        'Very Positive': '#10b981',
-        'Positive': '#34d399',
-        'Neutral': '#f59e0b',
-        'Negative': '#f87171',
-        'Very Negative': '#ef4444'
-    }
-    
     fig = go.Figure(data=[go.Pie(
         labels=emotion_counts.index,
         values=emotion_counts.values,
-        marker=dict(colors=[colors.get(e, '#667eea') for e in emotion_counts.index]),
+        marker=dict(colors=[EMOTION_COLORS.get(e, '#667eea') for e in emotion_counts.index]),
         hole=0.4,
         textinfo='label+percent',
         textfont=dict(size=14, family="Inter, sans-serif", color="white")
@@ -525,27 +643,19 @@ def create_emotion_distribution(entries_df):
     
     fig.update_layout(
         title="Emotion Distribution",
-        template='plotly_white',
-        height=400,
-        font=dict(family="Inter, sans-serif", size=12, color="#1e293b"),
-        title_font=dict(size=18, family="Inter, sans-serif", color="#1e293b"),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        legend=dict(
-            font=dict(color="#1e293b")
-        )
+        template=get_chart_template(),
+        height=400
     )
     
     return fig
 
 
-def create_keyword_chart(all_keywords):
-    """Create keyword frequency chart"""
-    if not all_keywords:
+def create_keyword_chart(keyword_counts):
+    """Create keyword frequency chart from (keyword, count) pairs"""
+    if not keyword_counts:
         return None
     
-    keyword_counts = Counter(all_keywords)
-    top_keywords = dict(keyword_counts.most_common(15))
+    top_keywords = dict(keyword_counts)
     
     fig = go.Figure(data=[
         go.Bar(
@@ -567,42 +677,253 @@ def create_keyword_chart(all_keywords):
         title="Most Common Themes in Your Entries",
         xaxis_title="Frequency",
         yaxis_title="Keywords",
-        template='plotly_white',
-        height=500,
-        font=dict(family="Inter, sans-serif", size=12, color="#1e293b"),
-        title_font=dict(size=18, family="Inter, sans-serif", color="#1e293b"),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(
-            title_font=dict(color="#1e293b"),
-            tickfont=dict(color="#1e293b")
-        ),
-        yaxis=dict(
-            title_font=dict(color="#1e293b"),
-            tickfont=dict(color="#1e293b")
-        )
+        template=get_chart_template(),
+        height=500
     )
     
     return fig
 
 
-def display_entry_card(entry, index):
-    """Display a single journal entry as a card"""
-    emotion = entry['sentiment']['emotion']
-    compound = entry['sentiment']['compound']
-    
-    # Emotion badge
-    if compound >= 0.05:
-        badge_class = "positive-badge"
-        emoji = "😊"
-    elif compound <= -0.05:
-        badge_class = "negative-badge"
-        emoji = "😔"
+def get_chart(journal, name, *params):
+    """Figure for one Analytics chart, built only once per journal version and parameter set
+    (the date window for the sentiment and emotion charts, top-N and window for keywords);
+    only the latest parameter set of each chart is kept"""
+    builders = {
+        'sentiment': lambda j: create_sentiment_chart(get_analytics_frame(j, *params)),
+        'emotions': lambda j: create_emotion_distribution(get_analytics_frame(j, *params)),
+        'keywords': lambda j: create_keyword_chart(j.top_keywords(*params))
+    }
+    return cached_for_version(journal, ('chart', name), builders[name], params)
+
+
+def get_analytics_frame(journal, start=None, end=None):
+    """Journal's cached score frame, optionally narrowed to a date window, with mood labels
+    derived once per journal version"""
+    df = journal.frame()
+    if 'mood' not in df.columns:
+        df['mood'] = classify_moods(df['compound'])
+    return journal.frame(start, end)
+
+
+DATE_PERIODS = {
+    'All time': None,
+    'Last 7 days': 7,
+    'Last 30 days': 30,
+    'Last 90 days': 90,
+    'Custom range': 'custom'
+}
+
+
+def select_date_window(key):
+    """(start, end) dates of the period picked in the widgets named after key, or (None, None) for all time"""
+    period = DATE_PERIODS[st.selectbox("Period", list(DATE_PERIODS), key=f'{key}_period')]
+    today = entry_today()
+    if period is None:
+        return None, None
+    if period == 'custom':
+        dates = st.date_input("Date range", value=(today - timedelta(days=29), today), key=f'{key}_range')
+        # While a range is being picked only its first date is set
+        if isinstance(dates, (tuple, list)):
+            return (dates[0], dates[-1]) if dates else (None, None)
+        return dates, dates
+    return today - timedelta(days=period - 1), today
+
+
+def cached_for_version(journal, key, build, params=()):
+    """Value of build(journal), recomputed only after the journal or params change
+
+    Each key holds a single value, so a new params (such as another date
+    window) replaces the previous one instead of piling up for the session.
+    """
+    cache = st.session_state.version_cache
+    cached = cache.get(key)
+    if cached is None or cached[0] != journal.version or cached[1] != params:
+        cached = cache[key] = (journal.version, params, build(journal))
+    return cached[2]
+
+
+def count_words(journal):
+    """Total words written across all entries"""
+    return sum(len(text.split()) for text in journal.texts())
+
+
+def get_export_file(journal, fmt, compress):
+    """Bytes of a previously built export, or None if it was never built or the journal changed since"""
+    cached = st.session_state.export_files.get((fmt, compress))
+    if cached is not None and cached[0] == journal.version:
+        return cached[1]
+    return None
+
+
+def build_export_file(journal, fmt, compress):
+    """Stream an export through a temporary file on demand and keep its bytes until the journal changes
+
+    The file holds the full journal text, so it is read back and deleted at
+    once rather than left in the shared temporary directory.
+    """
+    metadata = {
+        'exported_at': datetime.now().isoformat(),
+        'total_entries': len(journal),
+        'app_version': APP_VERSION
+    }
+    path = export_to_tempfile(journal, fmt, metadata, compress)
+    try:
+        with open(path, 'rb') as export_file:
+            payload = export_file.read()
+    finally:
+        os.unlink(path)
+    
+    st.session_state.export_files[(fmt, compress)] = (journal.version, payload)
+    return payload
+
+
+def import_journal_file(journal, fileobj):
+    """Stream an exported file into the store and the journal, skipping entries already present"""
+    existing_keys = (
+        entry_key(timestamp, text)
+        for timestamp, text in zip(journal.timestamps(), journal.texts())
+    )
+    job = JournalImport(
+        fileobj,
+        analyze_sentiment_batch,
+        extract_keywords_batch,
+        classify_emotions,
+        existing_keys
+    )
+    
+    status = st.empty()
+    imported = []
+    try:
+        for batch in job.batches():
+            get_store().add_many(st.session_state.user_id, batch)
+            imported.extend(batch)
+            status.caption(f"Imported {job.imported} of {job.read} rows read...")
+    finally:
+        # Batches already stored belong in the journal too, even when a later one fails
+        status.empty()
+        journal.merge(imported)
+    get_analysis_cache().save()
+    return job
+
+
+BACKGROUND_ANALYSIS_DEFAULT = os.environ.get('MOODLENS_BACKGROUND_ANALYSIS') == '1'
+
+# Seconds between reruns while background analyses are outstanding
+PENDING_POLL_SECONDS = 0.5
+
+
+def queue_analysis(entry, row_id=None):
+    """Store an entry whose analysis is handed to the background workers, unless it is stored already"""
+    if row_id is None:
+        row_id = get_store().add_pending(st.session_state.user_id, entry)
+    future = get_background_analyzer().submit(entry['text'])
+    st.session_state.pending_analyses.append((row_id, entry, future))
+
+
+def collect_analyses(journal):
+    """Complete the stored rows of entries whose background analysis finished and add them to the journal
+
+    An analysis that raised on a worker is retried once in this run; if that
+    fails too, the row is marked failed so no later session queues it again.
+    """
+    finished = []
+    still_pending = []
+    for row_id, entry, future in st.session_state.pending_analyses:
+        if not future.done():
+            still_pending.append((row_id, entry, future))
+            continue
+        if future.exception() is None:
+            analysis = future.result()
+        else:
+            try:
+                analysis = analyze_entry(entry['text'])
+            except Exception:
+                get_store().fail(row_id)
+                st.warning(f"The entry saved at {entry['timestamp']} could not be analyzed and was set aside.")
+                continue
+        entry = {**entry, **analysis}
+        get_store().complete(row_id, entry)
+        finished.append(entry)
+    st.session_state.pending_analyses = still_pending
+    if finished:
+        journal.merge(finished)
+
+
+def preview_draft(text):
+    """Live sentiment, keywords and sentence timeline figure of the draft being written
+
+    Long drafts are scored by segments through the analysis cache, so each
+    edit only re-scores the sentences it touched; reruns that leave the draft
+    unchanged reuse the previous preview outright.
+    """
+    preview = st.session_state.draft_preview
+    if preview is not None and preview['text'] == text:
+        return preview
+    
+    start = time.perf_counter()
+    if is_long_entry(text):
+        segmented = analyze_segments(text)
+        sentiment, segments = segmented['sentiment'], segmented['segments']
     else:
-        badge_class = "neutral-badge"
-        emoji = "😐"
+        sentiment, segments = analyze_sentiment(text), []
+    preview = {
+        'text': text,
+        'sentiment': sentiment,
+        'keywords': extract_keywords(text),
+        'segments': segments,
+        'seconds': time.perf_counter() - start,
+        # Built here so reruns with an unchanged draft reuse the figure as well
+        'figure': create_segment_timeline(segments)
+    }
+    st.session_state.draft_preview = preview
+    return preview
+
+
+def render_preview_card(preview):
+    """HTML of the live mood preview shown under the draft"""
+    sentiment = preview['sentiment']
+    badge_class, emoji = MOOD_BADGES[classify_mood(sentiment['compound'])]
+    return f"""
+    <div class="emotion-card">
+        <div style="display: flex; justify-content: space-between; align-items: center;">
+            <strong style="color: #667eea;">Live Preview</strong>
+            <span class="{badge_class}">{emoji} {sentiment['emotion']} ({sentiment['compound']:.2f})</span>
+        </div>
+        <div style="margin-top: 0.5rem;">
+            {''.join([f'<span class="keyword-badge">{kw}</span>' for kw in preview['keywords'][:5]])}
+        </div>
+    </div>
+    """
+
+
+# Entries per page offered in the History tab
+HISTORY_PAGE_SIZES = (10, 25, 50)
+
+# label -> (Journal.order key, descending)
+HISTORY_SORTS = {
+    'Newest first': ('date', True),
+    'Oldest first': ('date', False),
+    'Most positive': ('sentiment', True),
+    'Most negative': ('sentiment', False)
+}
+
+
+# Positive entries per page of the gratitude collection
+GRATITUDE_PAGE_SIZE = 10
+
+# label -> Journal.positives ordering
+GRATITUDE_SORTS = {
+    'Most recent': 'date',
+    'Most positive': 'sentiment'
+}
+
+
+def render_entry_card(entry):
+    """HTML of a single journal entry card"""
+    emotion = entry['sentiment']['emotion']
+    badge_class, emoji = MOOD_BADGES[classify_mood(entry['sentiment']['compound'])]
     
-    st.markdown(f"""
+    return f"""
     <div class="emotion-card">
         <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
             <span class="entry-timestamp">{entry['timestamp']}</span>
@@ -618,10 +939,101 @@ def display_entry_card(entry, index):
             </div>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+
+def render_pending_card(entry):
+    """HTML of an entry card whose analysis has not finished yet"""
+    return f"""
+    <div class="emotion-card">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
+            <span class="entry-timestamp">{entry['timestamp']}</span>
+            <span class="neutral-badge">⏳ Analyzing...</span>
+        </div>
+        <div style="font-size: 1.05rem; line-height: 1.6; color: #334155;">
+            {entry['text'][:300]}{"..." if len(entry['text']) > 300 else ""}
+        </div>
+    </div>
+    """
+
+
+def render_gratitude_card(entry):
+    """HTML of a single positive entry in the gratitude collection"""
+    return f"""
+    <div class="gratitude-card">
+        <div style="display: flex; justify-content: space-between; margin-bottom: 0.5rem;">
+            <span class="entry-timestamp">{entry['timestamp']}</span>
+            <span style="color: #10b981; font-weight: 600;">
+                Sentiment: {entry['sentiment']['compound']:.2f}
+            </span>
+        </div>
+        <div style="font-size: 1.05rem; line-height: 1.6; color: #065f46; margin-top: 1rem;">
+            {entry['text']}
+        </div>
+    </div>
+    """
+
+
+def display_entry_cards(entries):
+    """Display journal entries as cards, all in one markdown element"""
+    st.markdown(''.join(render_entry_card(entry) for entry in entries), unsafe_allow_html=True)
+
+
+def get_user_id():
+    """Journal id for this browser, kept in the URL so reloads and bookmarks reopen the same journal"""
+    user_id = st.query_params.get('journal')
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.query_params['journal'] = user_id
+    return user_id
+
+
+# Initialize session state, loading the stored history once per session
+if 'journal' not in st.session_state:
+    st.session_state.user_id = get_user_id()
+    start = time.perf_counter()
+    stored_rows = get_store().load_rows(st.session_state.user_id)
+    st.session_state.journal = Journal.from_rows(stored_rows, positive_threshold=MOOD_THRESHOLD)
+    st.session_state.journal_load_seconds = time.perf_counter() - start
+
+if 'show_prompt' not in st.session_state:
+    st.session_state.show_prompt = False
+
+# Built exports keyed by (format, compressed), stored as (journal version, bytes)
+if 'export_files' not in st.session_state:
+    st.session_state.export_files = {}
+
+# Derived values keyed by name, stored as (journal version, params, value)
+if 'version_cache' not in st.session_state:
+    st.session_state.version_cache = {}
+
+# Opt-in: save entries at once and analyze them on a worker pool
+if 'background_analysis' not in st.session_state:
+    st.session_state.background_analysis = BACKGROUND_ANALYSIS_DEFAULT
+
+# Live mood preview of the draft, and the last preview so unchanged drafts are not rescored
+if 'live_preview' not in st.session_state:
+    st.session_state.live_preview = True
+
+if 'draft_preview' not in st.session_state:
+    st.session_state.draft_preview = None
+
+# Entries saved before their background analysis finished, as (row id, entry, future);
+# rows a previous session left pending are analyzed again
+if 'pending_analyses' not in st.session_state:
+    st.session_state.pending_analyses = []
+    for row_id, timestamp, text in get_store().load_pending(st.session_state.user_id):
+        queue_analysis({'timestamp': timestamp, 'date': timestamp[:10], 'text': text}, row_id)
+
+# Inverted index over entry texts for the History tab, filled on the first search
+if 'search_index' not in st.session_state:
+    st.session_state.search_index = SearchIndex(DEFAULT_KEYWORD_EXTRACTOR.tokenize)
 
 
 def main():
+    journal = st.session_state.journal
+    collect_analyses(journal)
+    
     # Header
     st.markdown(f"""
     <div class="app-header">
@@ -654,14 +1066,21 @@ def main():
         st.markdown("---")
         
         # Quick stats
-        if st.session_state.entries:
+        if journal:
             st.markdown("### Quick Stats")
-            st.metric("Total Entries", len(st.session_state.entries))
+            st.metric("Total Entries", len(journal))
             
             # Calculate average sentiment
-            avg_sentiment = sum([e['sentiment']['compound'] for e in st.session_state.entries]) / len(st.session_state.entries)
-            sentiment_emoji = "😊" if avg_sentiment > 0.05 else ("😔" if avg_sentiment < -0.05 else "😐")
+            avg_sentiment = journal.stats()['avg_compound']
+            sentiment_emoji = MOOD_BADGES[classify_mood(avg_sentiment)][1]
             st.metric("Average Mood", f"{sentiment_emoji} {avg_sentiment:.2f}")
+            
+            streaks = journal.streaks(entry_today())
+            st.metric(
+                "Journaling Streak",
+                f"{streaks['current_journaling']} days",
+                help=f"Longest streak: {streaks['longest_journaling']} days"
+            )
         
         st.markdown("---")
         
@@ -674,21 +1093,51 @@ def main():
         5. **Export** your complete history
         """)
         
+        if VADER_AVAILABLE:
+            _, load_seconds = get_analyzer()
+            st.caption(f"Sentiment engine loaded in {load_seconds * 1000:.0f} ms")
+        cache_stats = get_analysis_cache().stats()
+        st.caption(
+            f"Analysis cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['evictions']} evictions"
+        )
+        st.caption(
+            f"Journal of {len(journal)} entries loaded in "
+            f"{st.session_state.journal_load_seconds * 1000:.0f} ms"
+        )
+        
+        st.checkbox(
+            "Analyze entries in the background",
+            key='background_analysis',
+            help="Save entries instantly and fill in their analysis as soon as it is ready"
+        )
+        if st.session_state.background_analysis or st.session_state.pending_analyses:
+            queue_stats = get_background_analyzer().stats()
+            st.caption(
+                f"Background analysis: {queue_stats['workers']} workers, {queue_stats['queued']} queued, "
+                f"{queue_stats['running']} running · time to analysis "
+                f"{queue_stats['mean_seconds'] * 1000:.0f} ms avg, {queue_stats['p95_seconds'] * 1000:.0f} ms p95"
+            )
+        
         st.markdown("---")
         
         # Clear data button
-        if st.session_state.entries:
+        if journal:
             if st.button("Clear All Data", type="secondary"):
                 if st.checkbox("Confirm deletion"):
-                    st.session_state.entries = []
+                    get_store().clear(st.session_state.user_id)
+                    journal.clear()
+                    st.session_state.pending_analyses = []
+                    st.session_state.export_files = {}
                     st.rerun()
     
     # Main tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "New Entry",
         "Analytics",
+        "History",
         "Gratitude Journal",
-        "Export Data"
+        "Export & Import"
     ])
     
     # TAB 1: New Entry
@@ -717,252 +1166,337 @@ def main():
             label_visibility="collapsed"
         )
         
+        # The text area sends its value when it loses focus or on Ctrl+Enter, which debounces the preview
+        st.checkbox(
+            "Live mood preview",
+            key='live_preview',
+            help="Update the mood and keywords below whenever you click away from the text box or press Ctrl+Enter"
+        )
+        if st.session_state.live_preview and entry_text and len(entry_text.strip()) > 10:
+            preview = preview_draft(entry_text)
+            st.markdown(render_preview_card(preview), unsafe_allow_html=True)
+            if preview['segments']:
+                st.caption(
+                    f"{len(preview['segments'])} sentences, scored incrementally in "
+                    f"{preview['seconds'] * 1000:.1f} ms"
+                )
+                st.plotly_chart(preview['figure'], use_container_width=True)
+            else:
+                st.caption(f"Scored in {preview['seconds'] * 1000:.1f} ms")
+        
         col1, col2, col3 = st.columns([2, 1, 1])
         
         with col1:
             if st.button("Save Entry", type="primary"):
                 if entry_text and len(entry_text.strip()) > 10:
-                    # Analyze entry
-                    sentiment = analyze_sentiment(entry_text)
-                    keywords = extract_keywords(entry_text)
-                    
                     # Create entry with Toronto timezone
-                    utc_now = datetime.utcnow()
-                    utc_tz = pytz.UTC
-                    toronto_tz = pytz.timezone('America/Toronto')
-                    utc_time = utc_tz.localize(utc_now)
-                    toronto_time = utc_time.astimezone(toronto_tz)
+                    toronto_time = entry_now()
                     
                     entry = {
                         'timestamp': toronto_time.strftime('%Y-%m-%d %H:%M:%S'),
                         'date': toronto_time.strftime('%Y-%m-%d'),
-                        'text': entry_text,
-                        'sentiment': sentiment,
-                        'keywords': keywords
+                        'text': entry_text
                     }
                     
-                    # Save entry
-                    st.session_state.entries.insert(0, entry)
-                    
-                    # Show success with analysis
-                    st.markdown("""
-                    <div style="background-color: #d1fae5; border-left: 5px solid #10b981; padding: 1rem; border-radius: 8px; margin: 1rem 0;">
-                        <p style="color: #065f46; font-weight: 600; margin: 0; font-size: 1.05rem;">✓ Entry saved successfully!</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown('<div class="section-header">Instant Analysis</div>', unsafe_allow_html=True)
-                    
-                    col_a, col_b, col_c = st.columns(3, gap="medium")
-                    
-                    with col_a:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value" style="font-size: 1.4rem;">{sentiment['emotion']}</div>
-                            <div class="metric-label">Detected Emotion</div>
+                    if st.session_state.background_analysis:
+                        # Save now, analyze on the worker pool
+                        queue_analysis(entry)
+                        st.markdown("""
+                        <div style="background-color: #d1fae5; border-left: 5px solid #10b981; padding: 1rem; border-radius: 8px; margin: 1rem 0;">
+                            <p style="color: #065f46; font-weight: 600; margin: 0; font-size: 1.05rem;">✓ Entry saved! Its analysis is running in the background.</p>
                         </div>
                         """, unsafe_allow_html=True)
-                    
-                    with col_b:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{sentiment['compound']:.2f}</div>
-                            <div class="metric-label">Sentiment Score</div>
+                    else:
+                        # Analyze entry
+                        sentiment = analyze_sentiment(entry_text)
+                        keywords = extract_keywords(entry_text)
+                        entry['sentiment'] = sentiment
+                        entry['keywords'] = keywords
+                        
+                        # Save entry
+                        get_store().add(st.session_state.user_id, entry)
+                        journal.add(entry)
+                        
+                        # Show success with analysis
+                        st.markdown("""
+                        <div style="background-color: #d1fae5; border-left: 5px solid #10b981; padding: 1rem; border-radius: 8px; margin: 1rem 0;">
+                            <p style="color: #065f46; font-weight: 600; margin: 0; font-size: 1.05rem;">✓ Entry saved successfully!</p>
                         </div>
                         """, unsafe_allow_html=True)
-                    
-                    with col_c:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{len(keywords)}</div>
-                            <div class="metric-label">Keywords Found</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    if keywords:
-                        st.markdown("**Key Themes:**")
-                        st.markdown(''.join([f'<span class="keyword-badge">{kw}</span>' for kw in keywords[:8]]), unsafe_allow_html=True)
-                    
+                        
+                        st.markdown('<div class="section-header">Instant Analysis</div>', unsafe_allow_html=True)
+                        
+                        col_a, col_b, col_c = st.columns(3, gap="medium")
+                        
+                        with col_a:
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <div class="metric-value" style="font-size: 1.4rem;">{sentiment['emotion']}</div>
+                                <div class="metric-label">Detected Emotion</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        with col_b:
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <div class="metric-value">{sentiment['compound']:.2f}</div>
+                                <div class="metric-label">Sentiment Score</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        with col_c:
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <div class="metric-value">{len(keywords)}</div>
+                                <div class="metric-label">Keywords Found</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        if keywords:
+                            st.markdown("**Key Themes:**")
+                            st.markdown(''.join([f'<span class="keyword-badge">{kw}</span>' for kw in keywords[:8]]), unsafe_allow_html=True)
+                        
+                        # Long entries are scored sentence by sentence; show how the mood moved through them
+                        if is_long_entry(entry_text):
+                            segments = analyze_segments(entry_text)['segments']
+                            st.caption(
+                                f"Long entry: scored as {len(segments)} sentences in "
+                                f"{segments[-1]['paragraph'] + 1} paragraphs, weighted by length."
+                            )
+                            if not st.session_state.live_preview:
+                                st.plotly_chart(create_segment_timeline(segments), use_container_width=True)
+                        
                     st.session_state.show_prompt = False
                     
                 else:
                     st.error("Please write at least 10 characters.")
         
-        # Recent entries
-        if st.session_state.entries:
+        # Recent entries, with any still being analyzed first
+        pending = st.session_state.pending_analyses
+        if journal or pending:
             st.markdown('<div class="section-header">Recent Entries</div>', unsafe_allow_html=True)
             
-            for idx, entry in enumerate(st.session_state.entries[:5]):
-                display_entry_card(entry, idx)
+            if pending:
+                st.markdown(
+                    ''.join(render_pending_card(entry) for _, entry, _ in reversed(pending)),
+                    unsafe_allow_html=True
+                )
+            display_entry_cards(journal[:5])
     
     # TAB 2: Analytics
     with tab2:
-        if not st.session_state.entries:
+        if not journal:
             st.info("Start writing entries to see your analytics and emotional trends!")
         else:
             st.markdown('<div class="section-header">Your Emotional Intelligence Dashboard</div>', unsafe_allow_html=True)
             
-            # Convert to DataFrame
-            entries_data = []
-            all_keywords = []
-            
-            for entry in st.session_state.entries:
-                entries_data.append({
-                    'date': entry['date'],
-                    'compound': entry['sentiment']['compound'],
-                    'emotion': entry['sentiment']['emotion'],
-                    'pos': entry['sentiment']['pos'],
-                    'neg': entry['sentiment']['neg'],
-                    'neu': entry['sentiment']['neu']
-                })
-                all_keywords.extend(entry['keywords'])
-            
-            df = pd.DataFrame(entries_data)
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            
-            # Key metrics
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                total_entries = len(st.session_state.entries)
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{total_entries}</div>
-                    <div class="metric-label">Total Entries</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                avg_sentiment = df['compound'].mean()
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{avg_sentiment:.2f}</div>
-                    <div class="metric-label">Avg Sentiment</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                positive_ratio = (df['compound'] > 0.05).sum() / len(df) * 100
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{positive_ratio:.0f}%</div>
-                    <div class="metric-label">Positive Days</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col4:
-                streak = len([e for e in st.session_state.entries if e['sentiment']['compound'] > 0])
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{streak}</div>
-                    <div class="metric-label">Positive Entries</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Sentiment trend chart
-            st.markdown('<div class="section-header">Sentiment Trends Over Time</div>', unsafe_allow_html=True)
-            sentiment_chart = create_sentiment_chart(df)
-            if sentiment_chart:
-                st.plotly_chart(sentiment_chart, use_container_width=True)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Emotion distribution
-                st.markdown('<div class="section-header">Emotion Distribution</div>', unsafe_allow_html=True)
-                emotion_chart = create_emotion_distribution(df)
-                if emotion_chart:
-                    st.plotly_chart(emotion_chart, use_container_width=True)
+            start, end = select_date_window('analytics')
+            stats = journal.stats(start, end)
             
-            with col2:
-                # Sentiment breakdown
-                st.markdown('<div class="section-header">Sentiment Breakdown</div>', unsafe_allow_html=True)
-                avg_pos = df['pos'].mean() * 100
-                avg_neu = df['neu'].mean() * 100
-                avg_neg = df['neg'].mean() * 100
+            if not stats['count']:
+                st.info("No entries in this period. Pick a longer one to see your analytics.")
+            else:
+                # Key metrics
+                col1, col2, col3, col4 = st.columns(4)
                 
-                st.markdown(f"""
-                <div class="stats-container">
-                    <div style="margin-bottom: 1rem;">
-                        <strong style="color: #10b981;">😊 Positive:</strong>
-                        <div style="background: #d1fae5; height: 30px; border-radius: 5px; width: {avg_pos}%; display: inline-block; margin-left: 1rem;"></div>
-                        <span style="margin-left: 0.5rem; font-weight: 600;">{avg_pos:.1f}%</span>
+                with col1:
+                    total_entries = stats['count']
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{total_entries}</div>
+                        <div class="metric-label">Total Entries</div>
                     </div>
-                    <div style="margin-bottom: 1rem;">
-                        <strong style="color: #f59e0b;">😐 Neutral:</strong>
-                        <div style="background: #fef3c7; height: 30px; border-radius: 5px; width: {avg_neu}%; display: inline-block; margin-left: 1rem;"></div>
-                        <span style="margin-left: 0.5rem; font-weight: 600;">{avg_neu:.1f}%</span>
+                    """, unsafe_allow_html=True)
+                
+                with col2:
+                    avg_sentiment = stats['avg_compound']
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{avg_sentiment:.2f}</div>
+                        <div class="metric-label">Avg Sentiment</div>
                     </div>
-                    <div>
-                        <strong style="color: #ef4444;">😔 Negative:</strong>
-                        <div style="background: #fecaca; height: 30px; border-radius: 5px; width: {avg_neg}%; display: inline-block; margin-left: 1rem;"></div>
-                        <span style="margin-left: 0.5rem; font-weight: 600;">{avg_neg:.1f}%</span>
+                    """, unsafe_allow_html=True)
+                
+                with col3:
+                    positive_ratio = stats['positive_ratio'] * 100
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{positive_ratio:.0f}%</div>
+                        <div class="metric-label">Positive Days</div>
                     </div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Keyword analysis
-            st.markdown('<div class="section-header">Your Most Common Themes</div>', unsafe_allow_html=True)
-            keyword_chart = create_keyword_chart(all_keywords)
-            if keyword_chart:
-                st.plotly_chart(keyword_chart, use_container_width=True)
-            
-            # Insights
-            st.markdown('<div class="section-header">Personalized Insights</div>', unsafe_allow_html=True)
-            
-            insights = []
-            
-            if avg_sentiment > 0.3:
-                insights.append("You're maintaining a very positive mindset! Keep nurturing these feelings.")
-            elif avg_sentiment > 0.1:
-                insights.append("Your overall mood is positive. Great emotional balance!")
-            elif avg_sentiment < -0.1:
-                insights.append("You've been experiencing challenging emotions. Remember, it's okay to seek support.")
-            
-            if positive_ratio > 70:
-                insights.append(f"{positive_ratio:.0f}% of your entries show positive emotions. You're doing amazing!")
-            
-            recent_trend = df.tail(5)['compound'].mean()
-            overall_trend = df['compound'].mean()
-            if recent_trend > overall_trend + 0.1:
-                insights.append("Your recent entries show improvement in mood. Keep up the positive momentum!")
-            elif recent_trend < overall_trend - 0.1:
-                insights.append("Recent entries show lower mood. Consider what might be affecting you and practice self-care.")
+                    """, unsafe_allow_html=True)
+                
+                with col4:
+                    streaks = journal.streaks(entry_today())
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{streaks['current_positive']}</div>
+                        <div class="metric-label">Positive Day Streak (best {streaks['longest_positive']})</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                # Sentiment trend chart
+                st.markdown('<div class="section-header">Sentiment Trends Over Time</div>', unsafe_allow_html=True)
+                sentiment_chart = get_chart(journal, 'sentiment', start, end)
+                if sentiment_chart:
+                    st.plotly_chart(sentiment_chart, use_container_width=True)
+                    st.caption(
+                        f"{len(sentiment_chart.data[-1].x)} points plotted for "
+                        f"{stats['count']} entries · chart payload "
+                        f"{chart_payload_size(journal, 'sentiment', start, end) / 1024:.0f} KB"
+                    )
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    # Emotion distribution
+                    st.markdown('<div class="section-header">Emotion Distribution</div>', unsafe_allow_html=True)
+                    emotion_chart = get_chart(journal, 'emotions', start, end)
+                    if emotion_chart:
+                        st.plotly_chart(emotion_chart, use_container_width=True)
+                
+                with col2:
+                    # Sentiment breakdown
+                    st.markdown('<div class="section-header">Sentiment Breakdown</div>', unsafe_allow_html=True)
+                    avg_pos = stats['avg_pos'] * 100
+                    avg_neu = stats['avg_neu'] * 100
+                    avg_neg = stats['avg_neg'] * 100
+                    
+                    st.markdown(f"""
+                    <div class="stats-container">
+                        <div style="margin-bottom: 1rem;">
+                            <strong style="color: #10b981;">😊 Positive:</strong>
+                            <div style="background: #d1fae5; height: 30px; border-radius: 5px; width: {avg_pos}%; display: inline-block; margin-left: 1rem;"></div>
+                            <span style="margin-left: 0.5rem; font-weight: 600;">{avg_pos:.1f}%</span>
+                        </div>
+                        <div style="margin-bottom: 1rem;">
+                            <strong style="color: #f59e0b;">😐 Neutral:</strong>
+                            <div style="background: #fef3c7; height: 30px; border-radius: 5px; width: {avg_neu}%; display: inline-block; margin-left: 1rem;"></div>
+                            <span style="margin-left: 0.5rem; font-weight: 600;">{avg_neu:.1f}%</span>
+                        </div>
+                        <div>
+                            <strong style="color: #ef4444;">😔 Negative:</strong>
+                            <div style="background: #fecaca; height: 30px; border-radius: 5px; width: {avg_neg}%; display: inline-block; margin-left: 1rem;"></div>
+                            <span style="margin-left: 0.5rem; font-weight: 600;">{avg_neg:.1f}%</span>
+                        </div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                # Keyword analysis
+                st.markdown('<div class="section-header">Your Most Common Themes</div>', unsafe_allow_html=True)
+                keyword_chart = get_chart(journal, 'keywords', 15, start, end)
+                if keyword_chart:
+                    st.plotly_chart(keyword_chart, use_container_width=True)
+                
+                # Insights
+                st.markdown('<div class="section-header">Personalized Insights</div>', unsafe_allow_html=True)
+                
+                insights = []
+                
+                if avg_sentiment > 0.3:
+                    insights.append("You're maintaining a very positive mindset! Keep nurturing these feelings.")
+                elif avg_sentiment > 0.1:
+                    insights.append("Your overall mood is positive. Great emotional balance!")
+                elif avg_sentiment < -0.1:
+                    insights.append("You've been experiencing challenging emotions. Remember, it's okay to seek support.")
+                
+                if positive_ratio > 70:
+                    insights.append(f"{positive_ratio:.0f}% of your entries show positive emotions. You're doing amazing!")
+                
+                recent_trend = stats['recent_compound']
+                overall_trend = stats['avg_compound']
+                if recent_trend > overall_trend + 0.1:
+                    insights.append("Your recent entries show improvement in mood. Keep up the positive momentum!")
+                elif recent_trend < overall_trend - 0.1:
+                    insights.append("Recent entries show lower mood. Consider what might be affecting you and practice self-care.")
+                
+                top_keywords = journal.top_keywords(3, start, end)
+                if top_keywords:
+                    top_themes = ', '.join([kw[0] for kw in top_keywords])
+                    insights.append(f"Your most recurring themes: {top_themes}. These topics are central to your current experience.")
+                
+                for insight in insights:
+                    st.markdown(f"""
+                    <div class="insight-box">
+                        {insight}
+                    </div>
+                    """, unsafe_allow_html=True)
+    
+    # TAB 3: History
+    with tab3:
+        st.markdown('<div class="section-header">Your Journal History</div>', unsafe_allow_html=True)
+        
+        if not journal:
+            st.info("Start writing entries to build your history!")
+        else:
+            query = st.text_input(
+                "Search entries",
+                placeholder='Words to find, or "an exact phrase"',
+                key='search_query'
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                start, end = select_date_window('search')
+            with col2:
+                emotions = st.multiselect("Emotions", EMOTION_LABELS, key='search_emotions')
+            with col3:
+                sort_label = st.selectbox("Sort by", list(HISTORY_SORTS), key='history_sort')
+                sort_by, descending = HISTORY_SORTS[sort_label]
             
-            top_keywords = Counter(all_keywords).most_common(3)
-            if top_keywords:
-                top_themes = ', '.join([kw[0] for kw in top_keywords])
-                insights.append(f"Your most recurring themes: {top_themes}. These topics are central to your current experience.")
+            lookup_start = time.perf_counter()
+            if query.strip() or emotions or start or end:
+                search_index = st.session_state.search_index
+                if len(search_index) < len(journal):
+                    with st.spinner("Indexing your entries..."):
+                        search_index.refresh(journal)
+                    lookup_start = time.perf_counter()
+                matches = search_index.search(journal, query, start, end, emotions or None)
+                results = journal.order(matches, sort_by, descending)
+            else:
+                results = journal.order(None, sort_by, descending)
+            lookup_seconds = time.perf_counter() - lookup_start
             
-            for insight in insights:
-                st.markdown(f"""
-                <div class="insight-box">
-                    {insight}
-                </div>
-                """, unsafe_allow_html=True)
+            if not len(results):
+                if query.strip() and not st.session_state.search_index.searchable(query):
+                    st.warning("Nothing searchable in this query. Search looks for words made of letters.")
+                else:
+                    st.warning("No entries match your search.")
+            else:
+                col1, col2 = st.columns([3, 1])
+                with col2:
+                    page_size = st.selectbox("Entries per page", HISTORY_PAGE_SIZES, key='history_page_size')
+                pages = -(-len(results) // page_size)
+                with col1:
+                    # Keyed on the search and ordering so changing them starts again at page 1
+                    page = st.number_input(
+                        "Page", min_value=1, max_value=pages, value=1,
+                        key=f"history_page:{query}:{start}:{end}:{emotions}:{sort_label}:{page_size}"
+                    )
+                st.caption(
+                    f"{len(results)} entries found in {lookup_seconds * 1000:.1f} ms "
+                    f"· page {page} of {pages}"
+                )
+                offset = (page - 1) * page_size
+                display_entry_cards(journal.entries_at(results[offset:offset + page_size]))
     
-    # TAB 3: Gratitude Journal
-    with tab3:
+    # TAB 4: Gratitude Journal
+    with tab4:
         st.markdown('<div class="section-header">Your Gratitude Collection</div>', unsafe_allow_html=True)
         
-        if not st.session_state.entries:
+        if not journal:
             st.info("Start writing entries to see your gratitude moments!")
         else:
-            # Filter positive entries
-            positive_entries = [
-                e for e in st.session_state.entries 
-                if e['sentiment']['compound'] > 0.05
-            ]
+            # Positive entries are indexed by the journal as they are added
+            positive_count = len(journal.positives())
             
-            if not positive_entries:
+            if not positive_count:
                 st.warning("No positive entries yet. Keep writing - positive moments are coming!")
             else:
                 st.markdown(f"""
                 <div class="gratitude-card">
-                    <h3 style="margin-top: 0;">{len(positive_entries)} Positive Moments Captured</h3>
+                    <h3 style="margin-top: 0;">{positive_count} Positive Moments Captured</h3>
                     <p style="font-size: 1.05rem; color: #065f46;">
-                        You've documented {len(positive_entries)} entries with positive emotions. 
+                        You've documented {positive_count} entries with positive emotions. 
                         These are your bright spots - moments worth celebrating!
                     </p>
                 </div>
@@ -970,27 +1504,29 @@ def main():
                 
                 st.markdown('<div class="section-header">Highlighted Gratitude Entries</div>', unsafe_allow_html=True)
                 
-                # Show positive entries
-                for entry in positive_entries[:10]:
-                    st.markdown(f"""
-                    <div class="gratitude-card">
-                        <div style="display: flex; justify-content: space-between; margin-bottom: 0.5rem;">
-                            <span class="entry-timestamp">{entry['timestamp']}</span>
-                            <span style="color: #10b981; font-weight: 600;">
-                                Sentiment: {entry['sentiment']['compound']:.2f}
-                            </span>
-                        </div>
-                        <div style="font-size: 1.05rem; line-height: 1.6; color: #065f46; margin-top: 1rem;">
-                            {entry['text']}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                col1, col2 = st.columns([3, 1])
+                pages = -(-positive_count // GRATITUDE_PAGE_SIZE)
+                with col2:
+                    order = GRATITUDE_SORTS[st.selectbox("Show", list(GRATITUDE_SORTS), key='gratitude_sort')]
+                with col1:
+                    page = st.number_input(
+                        "Page", min_value=1, max_value=pages, value=1,
+                        key=f"gratitude_page:{order}"
+                    )
+                
+                # Show one page of positive entries
+                offset = (page - 1) * GRATITUDE_PAGE_SIZE
+                positions = journal.positives(order)[offset:offset + GRATITUDE_PAGE_SIZE]
+                st.markdown(
+                    ''.join(render_gratitude_card(entry) for entry in journal.entries_at(positions)),
+                    unsafe_allow_html=True
+                )
     
-    # TAB 4: Export Data
-    with tab4:
+    # TAB 5: Export & Import
+    with tab5:
         st.markdown('<div class="section-header">Export Your Wellness Data</div>', unsafe_allow_html=True)
         
-        if not st.session_state.entries:
+        if not journal:
             st.info("No entries to export yet. Start writing to build your wellness history!")
         else:
             st.markdown("""
@@ -1008,13 +1544,13 @@ def main():
             with col1:
                 st.markdown(f"""
                 <div class="metric-card">
-                    <div class="metric-value">{len(st.session_state.entries)}</div>
+                    <div class="metric-value">{len(journal)}</div>
                     <div class="metric-label">Entries Ready</div>
                 </div>
                 """, unsafe_allow_html=True)
             
             with col2:
-                total_words = sum([len(e['text'].split()) for e in st.session_state.entries])
+                total_words = cached_for_version(journal, 'total_words', count_words)
                 st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-value">{total_words}</div>
@@ -1023,7 +1559,7 @@ def main():
                 """, unsafe_allow_html=True)
             
             with col3:
-                date_range = f"{st.session_state.entries[-1]['date']} to {st.session_state.entries[0]['date']}"
+                date_range = f"{journal.oldest()['date']} to {journal.newest()['date']}"
                 st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-value">📅</div>
@@ -1035,62 +1571,68 @@ def main():
             # Export options
             st.markdown('<div class="section-header">Choose Export Format</div>', unsafe_allow_html=True)
             
-            # JSON Export
-            export_data = {
-                'exported_at': datetime.now().isoformat(),
-                'total_entries': len(st.session_state.entries),
-                'app_version': APP_VERSION,
-                'entries': st.session_state.entries
-            }
-            
-            json_data = json.dumps(export_data, indent=2)
-            
             col1, col2 = st.columns(2)
             
             with col1:
-                st.download_button(
-                    label="Download as JSON",
-                    data=json_data,
-                    file_name=f"mindflow_journal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
+                formats = {
+                    label: fmt for fmt, (label, _, _) in EXPORT_FORMATS.items()
+                    if fmt != 'parquet' or PARQUET_AVAILABLE
+                }
+                fmt = formats[st.selectbox("Format", list(formats))]
             
             with col2:
-                # CSV Export
-                csv_data = []
-                for entry in st.session_state.entries:
-                    csv_data.append({
-                        'Timestamp': entry['timestamp'],
-                        'Text': entry['text'],
-                        'Emotion': entry['sentiment']['emotion'],
-                        'Sentiment_Score': entry['sentiment']['compound'],
-                        'Positive': entry['sentiment']['pos'],
-                        'Neutral': entry['sentiment']['neu'],
-                        'Negative': entry['sentiment']['neg'],
-                        'Keywords': ', '.join(entry['keywords'])
-                    })
-                
-                csv_df = pd.DataFrame(csv_data)
-                csv_string = csv_df.to_csv(index=False)
-                
+                st.markdown("<div style='height: 1.9rem;'></div>", unsafe_allow_html=True)
+                compress = st.checkbox("Compress with gzip")
+            
+            payload = get_export_file(journal, fmt, compress)
+            if payload is None:
+                if st.button("Prepare Export", use_container_width=True):
+                    build_export_file(journal, fmt, compress)
+                    st.rerun()
+            else:
+                label, extension, mime = EXPORT_FORMATS[fmt]
                 st.download_button(
-                    label="Download as CSV",
-                    data=csv_string,
-                    file_name=f"mindflow_journal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
+                    label=f"Download as {label}",
+                    data=payload,
+                    file_name=f"mindflow_journal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}" + (".gz" if compress else ""),
+                    mime="application/gzip" if compress else mime,
                     use_container_width=True
                 )
+                st.caption(f"{len(payload) / 1024:,.1f} KB, streamed to disk in chunks of {EXPORT_CHUNK_SIZE} entries")
             
             st.markdown("""
             <div class="stats-container" style="margin-top: 2rem;">
                 <h4>Privacy Notice</h4>
                 <p style="color: #64748b;">
-                    Your exported data is completely private. All processing happens locally in your browser.
-                    We never see, store, or transmit your journal entries.
+                    Your exported data is completely private. All processing happens locally on the MoodLens server,
+                    and entries are kept only in its local journal database. We never transmit your journal entries.
                 </p>
             </div>
             """, unsafe_allow_html=True)
+        
+        # Import
+        st.markdown('<div class="section-header">Import a Journal</div>', unsafe_allow_html=True)
+        
+        uploaded_file = st.file_uploader(
+            "Restore entries from a MoodLens export (JSON, JSON Lines, CSV or Parquet, optionally gzipped)",
+            type=['json', 'jsonl', 'csv', 'parquet', 'gz']
+        )
+        
+        if uploaded_file is not None and st.button("Import Entries", type="primary"):
+            try:
+                job = import_journal_file(journal, uploaded_file)
+            except (ValueError, RuntimeError) as error:
+                st.error(f"Could not import this file: {error}")
+            else:
+                st.success(
+                    f"Imported {job.imported} of {job.read} rows "
+                    f"({job.rescored} re-analyzed, {job.duplicates} duplicates skipped, {job.invalid} invalid)."
+                )
+    
+    # Rerun shortly while analyses are outstanding so their results replace the pending badges
+    if st.session_state.pending_analyses:
+        time.sleep(PENDING_POLL_SECONDS)
+        st.rerun()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,533 @@
+"""Journal entry container for MoodLens.
+
+Entries are stored oldest-first in append-only columns, so adding one is
+O(1), and are exposed newest-first (index 0 is the newest, -1 the oldest)
+exactly like the plain list the app used to keep in session state. Every
+derived index is updated in the same call that adds or removes an entry so
+that reruns only ever read them.
+
+Instead of one nested dict per entry the journal keeps parallel typed
+columns: epoch-second timestamps, a float matrix of scores, a one-byte
+emotion code and keyword ids into a per-journal vocabulary stored as one
+flat id array plus offsets. Indexing returns an EntryView, a read-only
+mapping with the old dict shape, built on access.
+
+Date-windowed analytics read DailyTotals, per-day counts and score sums
+stored as prefix sums, so any window is answered with two binary searches.
+Day streaks are kept by a StreakTracker fed from the same append path.
+"""
+import time
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+SCORE_FIELDS = ('compound', 'pos', 'neu', 'neg')
+ENTRY_FIELDS = ('timestamp', 'date', 'text', 'sentiment', 'keywords')
+EMOTION_LABELS = ('Very Negative', 'Negative', 'Neutral', 'Positive', 'Very Positive')
+_EMOTION_CODES = {label: code for code, label in enumerate(EMOTION_LABELS)}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Number of latest entries compared against the overall mean for the trend insight
+RECENT_WINDOW = 5
+
+_INITIAL_CAPACITY = 64
+_SECONDS_PER_DAY = 86400
+
+
+def parse_timestamp(timestamp):
+    """Epoch seconds of a 'YYYY-MM-DD HH:MM:SS' wall-clock timestamp"""
+    return int(np.datetime64(timestamp, 's').astype(np.int64))
+
+
+def format_timestamp(seconds):
+    """Inverse of parse_timestamp"""
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+def day_number(date):
+    """Days since the epoch of a date or 'YYYY-MM-DD' string"""
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+class DailyTotals:
+    """Per-day entry counts, score sums and positive counts of a journal, as prefix sums"""
+
+    __slots__ = ('days', '_counts', '_sums', '_positives')
+
+    def __init__(self, entry_days, scores, positive):
+        self.days, day_index = np.unique(entry_days, return_inverse=True)
+        n_days = len(self.days)
+        per_day_sums = np.column_stack([
+            np.bincount(day_index, weights=scores[:, i], minlength=n_days)
+            for i in range(scores.shape[1])
+        ]).reshape(n_days, scores.shape[1])
+        self._counts = np.concatenate(([0], np.cumsum(np.bincount(day_index, minlength=n_days))))
+        self._sums = np.vstack([np.zeros(scores.shape[1]), np.cumsum(per_day_sums, axis=0)])
+        self._positives = np.concatenate(([0], np.cumsum(np.bincount(day_index, weights=positive, minlength=n_days))))
+
+    def window(self, start=None, end=None):
+        """(entry count, score sums, positive count) of the days from start to end inclusive"""
+        lo = 0 if start is None else int(np.searchsorted(self.days, day_number(start), 'left'))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, day_number(end), 'right'))
+        hi = max(lo, hi)
+        return (
+            int(self._counts[hi] - self._counts[lo]),
+            self._sums[hi] - self._sums[lo],
+            int(round(self._positives[hi] - self._positives[lo]))
+        )
+
+
+class EntryView(Mapping):
+    """Read-only dict-like view of one journal entry"""
+
+    __slots__ = ('_journal', '_position')
+
+    def __init__(self, journal, position):
+        self._journal = journal
+        self._position = position
+
+    def __getitem__(self, key):
+        return self._journal._field(self._position, key)
+
+    def __iter__(self):
+        return iter(ENTRY_FIELDS)
+
+    def __len__(self):
+        return len(ENTRY_FIELDS)
+
+    def to_dict(self):
+        """Plain dict copy, as stored and exported before the columnar layout"""
+        return {key: self[key] for key in ENTRY_FIELDS}
+
+
+class StreakTracker:
+    """Current and longest runs of consecutive journaling days and positive-mood days.
+
+    Days must arrive in order to be counted in O(1); add() refuses an earlier
+    day and the owner rebuilds from all entries instead. A day is positive
+    when the mean compound score of its entries exceeds the threshold.
+    """
+
+    def __init__(self, positive_threshold=0.05):
+        self.positive_threshold = positive_threshold
+        self.last_day = None
+        self.longest_journaling = 0
+        self._day_sum = 0.0
+        self._day_count = 0
+        self._journaling_run = 0
+        self._positive_run = 0
+        # Positive run ending the day before last_day, which last_day extends if it is positive
+        self._previous_positive_run = 0
+        self._longest_closed_positive = 0
+
+    def add(self, day, compound_sum, count=1):
+        """Count entries of one day; returns False without counting if the day is earlier than the last one"""
+        if self.last_day is not None and day < self.last_day:
+            return False
+        if day != self.last_day:
+            consecutive = self.last_day is not None and day == self.last_day + 1
+            self._longest_closed_positive = max(self._longest_closed_positive, self._positive_run)
+            self._previous_positive_run = self._positive_run if consecutive else 0
+            self._journaling_run = self._journaling_run + 1 if consecutive else 1
+            self.longest_journaling = max(self.longest_journaling, self._journaling_run)
+            self.last_day = day
+            self._day_sum = 0.0
+            self._day_count = 0
+        self._day_sum += compound_sum
+        self._day_count += count
+        positive = self._day_sum / self._day_count > self.positive_threshold
+        self._positive_run = self._previous_positive_run + 1 if positive else 0
+        return True
+
+    def streaks(self, today=None):
+        """Streak lengths in days; current streaks are 0 unless the last entry is from today or yesterday"""
+        active = self.last_day is not None and (today is None or self.last_day >= day_number(today) - 1)
+        return {
+            'current_journaling': self._journaling_run if active else 0,
+            'longest_journaling': self.longest_journaling,
+            'current_positive': self._positive_run if active else 0,
+            'longest_positive': max(self._longest_closed_positive, self._positive_run)
+        }
+
+
+class Journal:
+    """Newest-first sequence of journal entries with incrementally maintained indexes"""
+
+    def __init__(self, entries=(), positive_threshold=0.05):
+        self.positive_threshold = positive_threshold
+        self.version = 0
+        # Bumped whenever column positions stop meaning what they meant; appends keep it
+        self.generation = 0
+        self.clear()
+        # Entries arrive newest-first (export order)
+        chronological = list(entries)[::-1]
+        if chronological:
+            self._load(chronological)
+
+    @classmethod
+    def from_rows(cls, rows, positive_threshold=0.05):
+        """Build a journal from oldest-first storage rows of
+        (timestamp, text, compound, pos, neu, neg, emotion, comma-joined keywords)"""
+        journal = cls(positive_threshold=positive_threshold)
+        if rows:
+            timestamps, texts, compound, pos, neu, neg, emotions, keywords = zip(*rows)
+            journal._load_columns(
+                timestamps,
+                list(texts),
+                np.column_stack([compound, pos, neu, neg]),
+                emotions,
+                [kw.split(',') if kw else [] for kw in keywords]
+            )
+        return journal
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __iter__(self):
+        for position in range(len(self._texts) - 1, -1, -1):
+            yield EntryView(self, position)
+
+    def __getitem__(self, index):
+        """Newest-first indexing; slices cost O(k) in the slice length"""
+        last = len(self._texts) - 1
+        if isinstance(index, slice):
+            return [EntryView(self, last - i) for i in range(last + 1)[index]]
+        if not -last - 1 <= index <= last:
+            raise IndexError('journal index out of range')
+        return EntryView(self, last - index if index >= 0 else -index - 1)
+
+    def newest(self):
+        """Most recently added entry"""
+        return self[0]
+
+    def oldest(self):
+        """First entry ever added"""
+        return self[-1]
+
+    def texts(self):
+        """Entry texts, oldest first"""
+        return self._texts
+
+    def timestamps(self):
+        """Entry timestamps as 'YYYY-MM-DD HH:MM:SS' strings, oldest first"""
+        iso = np.datetime_as_string(self._timestamps[:self._size].astype('datetime64[s]'))
+        return [timestamp.replace('T', ' ') for timestamp in iso.tolist()]
+
+    def entries_at(self, positions):
+        """Entries at the given column positions (0 is the oldest entry), in the given order"""
+        return [EntryView(self, int(position)) for position in positions]
+
+    def select(self, positions=None, start=None, end=None, emotions=None):
+        """Sorted column positions of the entries dated from start to end and labelled with one
+        of the given emotions, optionally only among the sorted candidate positions"""
+        if positions is None:
+            positions = np.arange(self._size)
+        positions = np.asarray(positions, dtype=np.int64)
+        mask = np.ones(len(positions), dtype=bool)
+        if start is not None or end is not None:
+            days = self._timestamps[positions] // _SECONDS_PER_DAY
+            if start is not None:
+                mask &= days >= day_number(start)
+            if end is not None:
+                mask &= days <= day_number(end)
+        if emotions is not None:
+            codes = [_EMOTION_CODES[emotion] for emotion in emotions if emotion in _EMOTION_CODES]
+            mask &= np.isin(self._emotions[positions], codes)
+        return positions[mask]
+
+    def order(self, positions=None, by='date', descending=True):
+        """Column positions sorted by entry timestamp ('date') or compound score ('sentiment');
+        all entries when positions is None, cached per journal version"""
+        if positions is None:
+            key = (by, descending)
+            if key not in self._orders:
+                self._orders[key] = self.order(np.arange(self._size), by, descending)
+            return self._orders[key]
+        positions = np.sort(np.asarray(positions, dtype=np.int64))
+        values = self._timestamps[positions] if by == 'date' else self._scores[positions, 0]
+        if descending:
+            # Reversing the stable ascending sort keeps ties newest first, like the journal's own order
+            return positions[np.argsort(values, kind='stable')[::-1]]
+        return positions[np.argsort(values, kind='stable')]
+
+    def positives(self, by='date'):
+        """Column positions of positive entries (compound above positive_threshold), latest added first
+        or, with by='sentiment', highest score first; cached per journal version"""
+        key = ('positive', by)
+        if key not in self._orders:
+            positions = np.array(self._positive_positions, dtype=np.int64)
+            self._orders[key] = positions[::-1] if by == 'date' else self.order(positions, 'sentiment', True)
+        return self._orders[key]
+
+    def records(self):
+        """All entries as plain dicts, newest first"""
+        return [entry.to_dict() for entry in self]
+
+    def iter_chunks(self, chunk_size=1000):
+        """Entries as plain dicts, newest first, in lists of at most chunk_size"""
+        for stop in range(len(self._texts), 0, -chunk_size):
+            start = max(0, stop - chunk_size)
+            yield [EntryView(self, position).to_dict() for position in range(stop - 1, start - 1, -1)]
+
+    def add(self, entry):
+        """Add a new entry as the newest one"""
+        self._append(entry)
+        self._changed()
+
+    def extend(self, entries):
+        """Add several entries, given oldest-first, as the newest ones"""
+        for entry in entries:
+            self._append(entry)
+        self._changed()
+
+    def merge(self, entries):
+        """Add entries from any point in time, keeping the journal in timestamp order"""
+        entries = sorted(entries, key=lambda entry: entry['timestamp'])
+        if not entries:
+            return
+        if not len(self) or entries[0]['timestamp'] >= self.newest()['timestamp']:
+            self.extend(entries)
+            return
+        # Back-dated entries: rebuild once from the stably sorted union
+        merged = sorted(self.records()[::-1] + entries, key=lambda entry: entry['timestamp'])
+        self.clear()
+        self._load(merged)
+
+    def _append(self, entry):
+        sentiment = entry['sentiment']
+        emotion = self._emotion_code(sentiment['emotion'])
+        n = self._size
+        if n == len(self._timestamps):
+            self._grow(2 * n)
+
+        timestamp = parse_timestamp(entry['timestamp'])
+        if n and timestamp // _SECONDS_PER_DAY < self._timestamps[n - 1] // _SECONDS_PER_DAY:
+            self._sorted = False
+        row = [sentiment[field] for field in SCORE_FIELDS]
+        self._timestamps[n] = timestamp
+        self._scores[n] = row
+        self._emotions[n] = emotion
+        self._texts.append(entry['text'])
+        self._keyword_ids.extend(self._keyword_id(keyword) for keyword in entry['keywords'])
+        self._keyword_offsets.append(len(self._keyword_ids))
+        self.keyword_counts.update(entry['keywords'])
+
+        self._size = n + 1
+        self._sums += row
+        if row[0] > self.positive_threshold:
+            self._positive_count += 1
+            self._positive_positions.append(n)
+        if not self._streaks_stale and not self._streaks.add(timestamp // _SECONDS_PER_DAY, row[0]):
+            self._streaks_stale = True
+
+    def clear(self):
+        """Remove every entry"""
+        self._size = 0
+        self._timestamps = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._scores = np.empty((_INITIAL_CAPACITY, len(SCORE_FIELDS)))
+        self._emotions = np.empty(_INITIAL_CAPACITY, dtype=np.uint8)
+        self._texts = []
+        self._vocabulary = []
+        self._vocabulary_ids = {}
+        self._keyword_ids = array('I')
+        self._keyword_offsets = array('Q', [0])
+        self.keyword_counts = Counter()
+        self._sorted = True
+        self._sums = np.zeros(len(SCORE_FIELDS))
+        self._positive_count = 0
+        self._positive_positions = array('Q')
+        self._streaks = StreakTracker(self.positive_threshold)
+        self._streaks_stale = False
+        self.generation += 1
+        self._changed()
+
+    def _load(self, chronological):
+        """Bulk-build every column from an oldest-first list of entry dicts into an empty journal"""
+        self._load_columns(
+            [entry['timestamp'] for entry in chronological],
+            [entry['text'] for entry in chronological],
+            [[entry['sentiment'][field] for field in SCORE_FIELDS] for entry in chronological],
+            [entry['sentiment']['emotion'] for entry in chronological],
+            [entry['keywords'] for entry in chronological]
+        )
+
+    def _load_columns(self, timestamps, texts, scores, emotions, keyword_lists):
+        n = len(texts)
+        self._grow(max(_INITIAL_CAPACITY, n))
+        self._timestamps[:n] = np.array(timestamps, dtype='datetime64[s]').astype(np.int64)
+        self._scores[:n] = scores
+        self._emotions[:n] = [self._emotion_code(emotion) for emotion in emotions]
+        self._texts = texts
+        keyword_id = self._keyword_id
+        for keywords in keyword_lists:
+            self._keyword_ids.extend(keyword_id(keyword) for keyword in keywords)
+            self._keyword_offsets.append(len(self._keyword_ids))
+            self.keyword_counts.update(keywords)
+
+        self._size = n
+        days = self._timestamps[:n] // _SECONDS_PER_DAY
+        self._sorted = bool(np.all(days[1:] >= days[:-1]))
+        self._sums = self._scores[:n].sum(axis=0)
+        positive = np.flatnonzero(self._scores[:n, 0] > self.positive_threshold)
+        self._positive_count = len(positive)
+        self._positive_positions = array('Q', positive.tolist())
+        self._streaks_stale = True
+        self.generation += 1
+        self._changed()
+
+    def _grow(self, capacity):
+        n = self._size
+        for name in ('_timestamps', '_scores', '_emotions'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+
+    @staticmethod
+    def _emotion_code(emotion):
+        # The one-byte column only ever holds the fixed tiers
+        code = _EMOTION_CODES.get(emotion)
+        if code is None:
+            raise ValueError(f'unknown emotion label {emotion!r}')
+        return code
+
+    def _keyword_id(self, keyword):
+        keyword_id = self._vocabulary_ids.get(keyword)
+        if keyword_id is None:
+            keyword_id = self._vocabulary_ids[keyword] = len(self._vocabulary)
+            self._vocabulary.append(keyword)
+        return keyword_id
+
+    def _field(self, position, key):
+        if key == 'timestamp':
+            return format_timestamp(int(self._timestamps[position]))
+        if key == 'date':
+            return format_timestamp(int(self._timestamps[position]))[:10]
+        if key == 'text':
+            return self._texts[position]
+        if key == 'sentiment':
+            sentiment = dict(zip(SCORE_FIELDS, self._scores[position].tolist()))
+            sentiment['emotion'] = EMOTION_LABELS[self._emotions[position]]
+            return sentiment
+        if key == 'keywords':
+            start, end = self._keyword_offsets[position], self._keyword_offsets[position + 1]
+            vocabulary = self._vocabulary
+            return [vocabulary[i] for i in self._keyword_ids[start:end]]
+        raise KeyError(key)
+
+    def _changed(self):
+        self.version += 1
+        self._frame = None
+        self._stats = None
+        self._daily = None
+        self._orders = {}
+
+    def _window_positions(self, start, end):
+        """Column positions of the entries dated from start to end inclusive"""
+        days = self._timestamps[:self._size] // _SECONDS_PER_DAY
+        first = -np.inf if start is None else day_number(start)
+        last = np.inf if end is None else day_number(end)
+        if self._sorted:
+            return range(int(np.searchsorted(days, first, 'left')), int(np.searchsorted(days, last, 'right')))
+        return np.flatnonzero((days >= first) & (days <= last)).tolist()
+
+    def top_keywords(self, n=15, start=None, end=None):
+        """Most frequent keywords as (keyword, count) pairs, over all entries or those dated from start to end"""
+        if start is None and end is None:
+            return self.keyword_counts.most_common(n)
+
+        positions = self._window_positions(start, end)
+        offsets = self._keyword_offsets
+        if isinstance(positions, range):
+            ids = self._keyword_ids[offsets[positions.start]:offsets[positions.stop]] if positions else []
+        else:
+            ids = array('I')
+            for position in positions:
+                ids.extend(self._keyword_ids[offsets[position]:offsets[position + 1]])
+        counts = np.bincount(np.asarray(ids, dtype=np.int64), minlength=len(self._vocabulary))
+        # Stable sort keeps first-seen order among ties, like Counter.most_common
+        top = np.argsort(-counts, kind='stable')[:n]
+        return [(self._vocabulary[i], int(counts[i])) for i in top if counts[i]]
+
+    def streaks(self, today=None):
+        """Current and longest positive-mood and journaling day streaks (see StreakTracker)"""
+        if self._streaks_stale:
+            # Rebuilt once after a bulk load or a back-dated entry, then kept up to date by appends again
+            n = self._size
+            days, day_index = np.unique(self._timestamps[:n] // _SECONDS_PER_DAY, return_inverse=True)
+            compound_sums = np.bincount(day_index, weights=self._scores[:n, 0], minlength=len(days))
+            counts = np.bincount(day_index, minlength=len(days))
+            self._streaks = StreakTracker(self.positive_threshold)
+            for day, compound_sum, count in zip(days.tolist(), compound_sums.tolist(), counts.tolist()):
+                self._streaks.add(day, compound_sum, count)
+            self._streaks_stale = False
+        return self._streaks.streaks(today)
+
+    def daily_totals(self):
+        """Per-day aggregates, rebuilt only after the journal changes"""
+        if self._daily is None:
+            n = self._size
+            self._daily = DailyTotals(
+                self._timestamps[:n] // _SECONDS_PER_DAY,
+                self._scores[:n],
+                self._scores[:n, 0] > self.positive_threshold
+            )
+        return self._daily
+
+    def frame(self, start=None, end=None):
+        """Date-sorted DataFrame of per-entry scores and emotion labels, optionally only the rows
+        dated from start to end; the full frame is rebuilt only after the journal changes"""
+        if start is not None or end is not None:
+            frame = self.frame()
+            dates = frame['date'].to_numpy()
+            lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), 'left')
+            hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), 'right')
+            return frame.iloc[lo:hi]
+        if self._frame is None:
+            n = self._size
+            frame = pd.DataFrame(self._scores[:n], columns=list(SCORE_FIELDS))
+            dates = self._timestamps[:n].astype('datetime64[s]').astype('datetime64[D]')
+            frame.insert(0, 'date', dates.astype('datetime64[ns]'))
+            frame['emotion'] = np.array(EMOTION_LABELS, dtype=object)[self._emotions[:n]]
+            if not self._sorted:
+                frame = frame.sort_values('date', kind='stable', ignore_index=True)
+            self._frame = frame
+        return self._frame
+
+    def stats(self, start=None, end=None):
+        """Aggregate metrics over all entries, read from running sums, or over the entries
+        dated from start to end, read from the daily prefix sums"""
+        if start is not None or end is not None:
+            n, sums, positives = self.daily_totals().window(start, end)
+            means = sums / n if n else sums
+            recent = self.frame(start, end)['compound'].to_numpy()[-RECENT_WINDOW:]
+            return {
+                'count': n,
+                'avg_compound': float(means[0]),
+                'avg_pos': float(means[1]),
+                'avg_neu': float(means[2]),
+                'avg_neg': float(means[3]),
+                'positive_ratio': positives / n if n else 0.0,
+                'recent_compound': float(recent.mean()) if n else 0.0
+            }
+        if self._stats is None:
+            n = self._size
+            means = self._sums / n if n else self._sums
+            if self._sorted:
+                recent = self._scores[max(0, n - RECENT_WINDOW):n, 0]
+            else:
+                recent = self.frame()['compound'].to_numpy()[-RECENT_WINDOW:]
+            self._stats = {
+                'count': n,
+                'avg_compound': float(means[0]),
+                'avg_pos': float(means[1]),
+                'avg_neu': float(means[2]),
+                'avg_neg': float(means[3]),
+                'positive_ratio': self._positive_count / n if n else 0.0,
+                'recent_compound': float(recent.mean()) if n else 0.0
+            }
+        return self._stats
@@ -0,0 +1,412 @@
+"""Streaming export and import of MoodLens journals.
+
+Writers pull entries from the Journal in fixed-size chunks and encode each
+chunk straight into the output file, so peak memory depends on the chunk
+size rather than on the length of the journal. The JSON and CSV writers
+produce byte-for-byte the same files as the original in-memory exports.
+
+JournalImport reads any of those files back (optionally gzipped) in the
+same chunked fashion, validates each row, reuses stored analysis where it
+is present and only re-scores the rows that lack it.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import textwrap
+
+import numpy as np
+
+from journal import EMOTION_LABELS, SCORE_FIELDS, format_timestamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    'Timestamp', 'Text', 'Emotion', 'Sentiment_Score',
+    'Positive', 'Neutral', 'Negative', 'Keywords'
+]
+
+# format -> (label, file extension, mime type)
+EXPORT_FORMATS = {
+    'json': ('JSON', 'json', 'application/json'),
+    'jsonl': ('JSON Lines', 'jsonl', 'application/x-ndjson'),
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet')
+}
+
+
+def iter_json(journal, metadata, chunk_size=CHUNK_SIZE):
+    """Text chunks of the indented JSON export: metadata fields followed by an 'entries' array"""
+    header = json.dumps({**metadata, 'entries': []}, indent=2)
+    if not len(journal):
+        yield header
+        return
+
+    # Reuse json.dumps for the metadata and splice the entries in before the closing brackets
+    yield header[:-len('[]\n}')] + '['
+    separator = '\n'
+    for chunk in journal.iter_chunks(chunk_size):
+        parts = []
+        for entry in chunk:
+            parts.append(separator)
+            parts.append(textwrap.indent(json.dumps(entry, indent=2), '    '))
+            separator = ',\n'
+        yield ''.join(parts)
+    yield '\n  ]\n}'
+
+
+def iter_jsonl(journal, chunk_size=CHUNK_SIZE):
+    """Text chunks of a JSON Lines export, one entry per line"""
+    for chunk in journal.iter_chunks(chunk_size):
+        yield ''.join(json.dumps(entry) + '\n' for entry in chunk)
+
+
+def iter_csv(journal, chunk_size=CHUNK_SIZE):
+    """Text chunks of the CSV export"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    for chunk in journal.iter_chunks(chunk_size):
+        for entry in chunk:
+            sentiment = entry['sentiment']
+            writer.writerow([
+                entry['timestamp'],
+                entry['text'],
+                sentiment['emotion'],
+                sentiment['compound'],
+                sentiment['pos'],
+                sentiment['neu'],
+                sentiment['neg'],
+                ', '.join(entry['keywords'])
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _write_parquet(journal, fileobj, chunk_size):
+    schema = pa.schema([
+        ('timestamp', pa.string()),
+        ('date', pa.string()),
+        ('text', pa.string()),
+        ('compound', pa.float64()),
+        ('pos', pa.float64()),
+        ('neu', pa.float64()),
+        ('neg', pa.float64()),
+        ('emotion', pa.string()),
+        ('keywords', pa.list_(pa.string()))
+    ])
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for chunk in journal.iter_chunks(chunk_size):
+            columns = {name: [] for name in schema.names}
+            for entry in chunk:
+                sentiment = entry['sentiment']
+                columns['timestamp'].append(entry['timestamp'])
+                columns['date'].append(entry['date'])
+                columns['text'].append(entry['text'])
+                for field in ('compound', 'pos', 'neu', 'neg', 'emotion'):
+                    columns[field].append(sentiment[field])
+                columns['keywords'].append(entry['keywords'])
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+def write_export(journal, fileobj, fmt, metadata=None, compress=False, chunk_size=CHUNK_SIZE):
+    """Stream a journal export in the given format into a binary file object"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    target = gzip.GzipFile(fileobj=fileobj, mode='wb') if compress else fileobj
+    try:
+        if fmt == 'parquet':
+            _write_parquet(journal, target, chunk_size)
+            return
+        if fmt == 'json':
+            chunks = iter_json(journal, metadata or {}, chunk_size)
+        elif fmt == 'jsonl':
+            chunks = iter_jsonl(journal, chunk_size)
+        else:
+            chunks = iter_csv(journal, chunk_size)
+        for text in chunks:
+            target.write(text.encode('utf-8'))
+    finally:
+        if compress:
+            target.close()
+
+
+def export_to_tempfile(journal, fmt, metadata=None, compress=False):
+    """Stream an export into a new temporary file and return its path"""
+    label, extension, mime = EXPORT_FORMATS[fmt]
+    suffix = f'.{extension}.gz' if compress else f'.{extension}'
+    fd, path = tempfile.mkstemp(prefix='moodlens_export_', suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as fileobj:
+            write_export(journal, fileobj, fmt, metadata, compress)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+IMPORT_BATCH_SIZE = 1000
+
+_JSON_READ_SIZE = 1 << 16
+_ENTRIES_ARRAY_START = re.compile(r'"entries"\s*:\s*\[')
+_ARRAY_SEPARATOR = re.compile(r'[\s,]*')
+
+# CSV export column -> sentiment field
+_CSV_SCORE_COLUMNS = {
+    'Sentiment_Score': 'compound',
+    'Positive': 'pos',
+    'Neutral': 'neu',
+    'Negative': 'neg'
+}
+
+
+def entry_key(timestamp, text):
+    """Duplicate-detection key of an entry: its timestamp plus a hash of its text"""
+    return timestamp, hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _iter_json_document(stream, initial=''):
+    """Objects of the 'entries' array of an exported JSON document, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = initial
+    while True:
+        match = _ENTRIES_ARRAY_START.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        chunk = stream.read(_JSON_READ_SIZE)
+        if not chunk:
+            raise ValueError("No 'entries' array found in JSON file")
+        buffer += chunk
+
+    position = 0
+    while True:
+        position = _ARRAY_SEPARATOR.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The next object is cut off by the end of the buffer: read more and retry
+            chunk = stream.read(_JSON_READ_SIZE)
+            if not chunk:
+                raise ValueError("JSON file ends in the middle of the entries array")
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield record
+        if position > _JSON_READ_SIZE:
+            buffer = buffer[position:]
+            position = 0
+
+
+def _iter_json_or_jsonl(first_line, stream):
+    try:
+        record = json.loads(first_line)
+    except ValueError:
+        # Indented export document
+        yield from _iter_json_document(stream, first_line)
+        return
+    if isinstance(record, dict) and 'entries' in record:
+        # Whole export document on a single line
+        yield from record['entries']
+        return
+    yield record
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_parquet(binary, batch_size):
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet import needs pyarrow: pip install pyarrow")
+    source = binary if binary.seekable() else pa.BufferReader(binary.read())
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def iter_raw_records(fileobj, batch_size=IMPORT_BATCH_SIZE):
+    """Raw records of an exported journal file in any supported format, optionally gzipped"""
+    binary = fileobj if hasattr(fileobj, 'peek') else io.BufferedReader(fileobj)
+    if binary.peek(2)[:2] == b'\x1f\x8b':
+        binary = gzip.GzipFile(fileobj=binary, mode='rb')
+    if binary.peek(4)[:4] == b'PAR1':
+        yield from _iter_parquet(binary, batch_size)
+        return
+
+    text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+    first_line = text.readline()
+    if first_line.lstrip().startswith('{'):
+        yield from _iter_json_or_jsonl(first_line, text)
+    else:
+        yield from csv.DictReader(itertools.chain([first_line], text))
+
+
+# Years an imported timestamp may carry; anything else would not format back as 'YYYY-MM-DD HH:MM:SS'
+TIMESTAMP_YEARS = (1000, 9999)
+
+
+def _parse_timestamp(value):
+    """Epoch seconds of an imported timestamp, or None if it is blank, NaT or outside TIMESTAMP_YEARS"""
+    try:
+        parsed = np.datetime64(value.strip(), 's')
+    except (ValueError, OverflowError):
+        return None
+    if np.isnat(parsed):
+        return None
+    year = int(parsed.astype('datetime64[Y]').astype(np.int64)) + 1970
+    if not TIMESTAMP_YEARS[0] <= year <= TIMESTAMP_YEARS[1]:
+        return None
+    return int(parsed.astype(np.int64))
+
+
+def _parse_keywords(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # CSV exports join keywords with ', '
+        return [keyword.strip() for keyword in value.split(',') if keyword.strip()]
+    if isinstance(value, (list, tuple)) and all(isinstance(keyword, str) for keyword in value):
+        return list(value)
+    return None
+
+
+def _parse_sentiment(scores, emotion):
+    """Validated sentiment dict, or None if any score is missing or out of range; an emotion
+    outside EMOTION_LABELS is left None so it is derived from the compound score"""
+    try:
+        sentiment = {field: float(scores[field]) for field in SCORE_FIELDS}
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not -1.0 <= sentiment['compound'] <= 1.0:
+        return None
+    if not all(0.0 <= sentiment[field] <= 1.0 for field in ('pos', 'neu', 'neg')):
+        return None
+    sentiment['emotion'] = emotion if emotion in EMOTION_LABELS else None
+    return sentiment
+
+
+def normalize_record(record):
+    """Turn a raw JSON/JSON Lines/Parquet/CSV record into an entry dict.
+
+    Returns None for rows without usable text or timestamp. The entry's
+    'sentiment' or 'keywords' is None when the file did not carry valid
+    values for them, meaning they still have to be computed.
+    """
+    if not isinstance(record, dict):
+        return None
+    if 'Text' in record:
+        text, timestamp = record.get('Text'), record.get('Timestamp')
+        scores = {field: record.get(column) for column, field in _CSV_SCORE_COLUMNS.items()}
+        emotion = record.get('Emotion')
+        keywords = record.get('Keywords')
+    else:
+        text, timestamp = record.get('text'), record.get('timestamp')
+        scores = record.get('sentiment')
+        if not isinstance(scores, dict):
+            # Flat Parquet rows
+            scores = record
+        emotion = scores.get('emotion')
+        keywords = record.get('keywords')
+
+    if not isinstance(text, str) or not text.strip() or not isinstance(timestamp, str):
+        return None
+    seconds = _parse_timestamp(timestamp)
+    if seconds is None:
+        return None
+    timestamp = format_timestamp(seconds)
+
+    return {
+        'timestamp': timestamp,
+        'date': timestamp[:10],
+        'text': text,
+        'sentiment': _parse_sentiment(scores, emotion),
+        'keywords': _parse_keywords(keywords)
+    }
+
+
+class JournalImport:
+    """Streaming import of an exported journal file.
+
+    batches() yields lists of complete, de-duplicated entries of at most
+    batch_size, in file order. Rows that lack sentiment are scored with
+    score_batch(texts) and rows that lack keywords get extract_batch(texts),
+    one call per batch. Every entry's emotion is then set from its compound
+    score by label_emotions(compounds), so a label carried by the file never
+    disagrees with the score it is stored next to.
+    Counters on the instance report what happened to every row read.
+    """
+
+    def __init__(self, fileobj, score_batch, extract_batch, label_emotions,
+                 existing_keys=(), batch_size=IMPORT_BATCH_SIZE):
+        self.fileobj = fileobj
+        self.score_batch = score_batch
+        self.extract_batch = extract_batch
+        self.label_emotions = label_emotions
+        self.seen_keys = set(existing_keys)
+        self.batch_size = batch_size
+        self.read = 0
+        self.imported = 0
+        self.rescored = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    def batches(self):
+        records = iter_raw_records(self.fileobj, self.batch_size)
+        while True:
+            chunk = list(itertools.islice(records, self.batch_size))
+            if not chunk:
+                return
+            self.read += len(chunk)
+            entries = self._prepare(chunk)
+            if entries:
+                self.imported += len(entries)
+                yield entries
+
+    def _prepare(self, chunk):
+        entries = []
+        for record in chunk:
+            entry = normalize_record(record)
+            if entry is None:
+                self.invalid += 1
+                continue
+            key = entry_key(entry['timestamp'], entry['text'])
+            if key in self.seen_keys:
+                self.duplicates += 1
+                continue
+            self.seen_keys.add(key)
+            entries.append(entry)
+
+        unscored = [entry for entry in entries if entry['sentiment'] is None]
+        if unscored:
+            for entry, sentiment in zip(unscored, self.score_batch([e['text'] for e in unscored])):
+                entry['sentiment'] = sentiment
+            self.rescored += len(unscored)
+
+        missing_keywords = [entry for entry in entries if entry['keywords'] is None]
+        if missing_keywords:
+            for entry, keywords in zip(missing_keywords, self.extract_batch([e['text'] for e in missing_keywords])):
+                entry['keywords'] = keywords
+
+        emotions = self.label_emotions([entry['sentiment']['compound'] for entry in entries])
+        for entry, emotion in zip(entries, emotions):
+            entry['sentiment']['emotion'] = str(emotion)
+        return entries
@@ -0,0 +1,146 @@
+"""Concurrent-session load test for the MoodLens journal backend.
+
+Simulates many browser sessions against one JournalStore the way the
+Streamlit server runs them, one thread per session: each session loads its
+seeded history into a Journal, then alternates saving a scored entry with
+reading the Analytics aggregates, pausing a random think time in between.
+Latency percentiles are reported per operation.
+
+    python load_test.py --sessions 200 --saves 20 --history 500 --think 1.0
+
+Use --think 0 for a closed-loop stress run where every session hammers the
+store back to back.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analysis import MOOD_THRESHOLD, analyze_entry
+from journal import Journal
+from storage import JournalStore
+
+WORDS = (
+    'grateful tired happy anxious calm walk family work deadline coffee friends '
+    'sleep rain sunny project dinner music run stressed proud lonely excited'
+).split()
+
+PERCENTILES = (50, 90, 99)
+
+
+def random_text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(8, 40)))
+
+
+def make_entry(text, when):
+    """Entry dict scored the way the app scores a new entry"""
+    return {
+        'timestamp': when.strftime('%Y-%m-%d %H:%M:%S'),
+        'date': when.strftime('%Y-%m-%d'),
+        'text': text,
+        **analyze_entry(text)
+    }
+
+
+def seed(store, user_ids, history):
+    """Give every simulated user `history` entries spread over the past year"""
+    rng = random.Random(0)
+    now = datetime.now()
+    for user_id in user_ids:
+        entries = [
+            make_entry(random_text(rng), now - timedelta(minutes=rng.randint(60, 525600)))
+            for _ in range(history)
+        ]
+        store.add_many(user_id, sorted(entries, key=lambda entry: entry['timestamp']))
+
+
+def run_session(store, user_id, saves, think, timings, lock):
+    rng = random.Random(user_id)
+    local = {'load': [], 'save': [], 'analytics': []}
+
+    start = time.perf_counter()
+    journal = Journal.from_rows(store.load_rows(user_id), positive_threshold=MOOD_THRESHOLD)
+    local['load'].append(time.perf_counter() - start)
+
+    today = datetime.now().date()
+    for _ in range(saves):
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+        start = time.perf_counter()
+        entry = make_entry(random_text(rng), datetime.now())
+        store.add(user_id, entry)
+        journal.add(entry)
+        local['save'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        journal.stats()
+        journal.stats(today - timedelta(days=29), today)
+        journal.frame()
+        journal.top_keywords(15)
+        journal.streaks(today)
+        local['analytics'].append(time.perf_counter() - start)
+
+    with lock:
+        for name, values in local.items():
+            timings[name].extend(values)
+
+
+def report(timings, elapsed):
+    print(f"{'operation':<10} {'count':>7} " + ' '.join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}")
+    for name, values in timings.items():
+        ms = np.array(values) * 1000
+        cells = ' '.join(f'{value:8.2f}ms' for value in np.percentile(ms, PERCENTILES))
+        print(f'{name:<10} {len(ms):>7} {cells} {ms.max():8.2f}ms')
+    print(f"{len(timings['save']) / elapsed:.0f} saves/s over {elapsed:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=200, help='concurrent simulated sessions')
+    parser.add_argument('--saves', type=int, default=20, help='entries saved by each session')
+    parser.add_argument('--history', type=int, default=500, help='stored entries per user before the test')
+    parser.add_argument('--think', type=float, default=1.0, help='mean seconds a session waits between saves')
+    parser.add_argument('--pool-size', type=int, default=8, help='SQLite connection pool size')
+    parser.add_argument('--db', help='database file (default: a temporary file)')
+    args = parser.parse_args()
+
+    directory = None
+    path = args.db
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'load_test.db')
+
+    store = JournalStore(path, pool_size=args.pool_size)
+    user_ids = [f'load-test-{i}' for i in range(args.sessions)]
+    for user_id in user_ids:
+        store.clear(user_id)
+
+    print(f'Seeding {args.sessions} users x {args.history} entries...')
+    seed(store, user_ids, args.history)
+
+    timings = {'load': [], 'save': [], 'analytics': []}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        futures = [
+            pool.submit(run_session, store, user_id, args.saves, args.think, timings, lock)
+            for user_id in user_ids
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    report(timings, elapsed)
+    store.close()
+    if directory is not None:
+        directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Headless MoodLens scoring: a streaming CLI and a local HTTP batch endpoint.
+
+Score plain-text lines or JSON Lines from stdin without starting Streamlit;
+lines are read and written in batches so arbitrarily long inputs run in
+constant memory, and large batches are scored on --workers processes:
+
+    cat entries.txt | python score_service.py score
+    python score_service.py score --jsonl < entries.jsonl > scored.jsonl
+
+In --jsonl mode every input object must have a "text" field; its other
+fields are passed through and "sentiment" and "keywords" are added.
+
+Serve the same scoring over HTTP on localhost:
+
+    python score_service.py serve --port 8765
+    curl -d '{"texts": ["What a lovely day"]}' http://127.0.0.1:8765/score
+
+POST /score takes {"texts": [...]} and answers {"results": [...]}, one
+{"sentiment", "keywords"} object per text; GET /health reports readiness.
+The server is multi-threaded, so it always scores in-process.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analysis import PARALLEL_BATCH_THRESHOLD, analyze_entries, get_analysis_cache, get_analyzer
+
+# Large enough that every full batch is scored on the process pool when --workers > 1
+DEFAULT_BATCH_SIZE = 2 * PARALLEL_BATCH_THRESHOLD
+DEFAULT_PORT = 8765
+
+# Largest request body the HTTP endpoint accepts
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+def iter_batches(lines, batch_size):
+    """Non-empty lines in lists of at most batch_size"""
+    lines = (line.rstrip('\n') for line in lines)
+    lines = (line for line in lines if line.strip())
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def score_stream(infile, outfile, jsonl=False, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """Score every line of infile and write one JSON object per line to outfile; returns the count"""
+    count = 0
+    for batch in iter_batches(infile, batch_size):
+        if jsonl:
+            records = [json.loads(line) for line in batch]
+            for i, record in enumerate(records):
+                if not isinstance(record, dict) or not isinstance(record.get('text'), str):
+                    raise ValueError(f'record {count + i + 1} has no "text" string')
+        else:
+            records = [{'text': line} for line in batch]
+        for record, result in zip(records, analyze_entries((record['text'] for record in records), workers)):
+            record.update(result)
+            outfile.write(json.dumps(record, ensure_ascii=False))
+            outfile.write('\n')
+        outfile.flush()
+        count += len(records)
+    return count
+
+
+class ScoreHandler(BaseHTTPRequestHandler):
+    """POST /score for batches of texts, GET /health for readiness checks"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, {'status': 'ok', 'cache': get_analysis_cache().stats()})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send_json(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            self._send_json(413, {'error': f'request body over {MAX_REQUEST_BYTES} bytes'})
+            return
+        try:
+            texts = json.loads(self.rfile.read(length))['texts']
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'expected a JSON body like {"texts": ["..."]}'})
+            return
+        self._send_json(200, {'results': analyze_entries(texts)})
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f'{self.address_string()} {format % args}\n')
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT):
+    """Run the batch scoring endpoint until interrupted"""
+    get_analyzer()
+    server = ThreadingHTTPServer((host, port), ScoreHandler)
+    print(f'Scoring on http://{host}:{server.server_port}/score', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score = commands.add_parser('score', help='score stdin line by line and write JSON Lines to stdout')
+    score.add_argument('--jsonl', action='store_true', help='read JSON objects with a "text" field instead of plain lines')
+    score.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='lines scored per batch')
+    score.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes for large batches')
+
+    server = commands.add_parser('serve', help='serve POST /score on a local port')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args(argv)
+    if args.command == 'score':
+        try:
+            count = score_stream(sys.stdin, sys.stdout, args.jsonl, args.batch_size, args.workers)
+        except ValueError as exc:
+            parser.exit(1, f'error: {exc}\n')
+        print(f'Scored {count} entries', file=sys.stderr)
+    else:
+        serve(args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
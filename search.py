@@ -0,0 +1,119 @@
+"""Full-text search over a MoodLens journal.
+
+SearchIndex is an inverted index from every token the keyword tokenizer
+produces to the sorted column positions of the entries containing it, plus
+every occurrence of the token packed as position << 32 | word offset.
+Keyword queries intersect posting lists, smallest first; quoted phrases
+shift the occurrences of their n-th word back by n and intersect them, so
+adjacency is checked on the index alone without re-reading any text. Date
+and emotion filters run over the candidates' columns in the Journal.
+
+The index is built on the first search and then follows the journal
+incrementally: appended entries are tokenized and added on the next
+search, and anything that renumbers positions (a removal, a back-dated
+merge, clearing) triggers one full rebuild.
+"""
+import re
+from array import array
+
+import numpy as np
+
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def parse_query(query, tokenize):
+    """Split a query into loose tokens and quoted phrases, each phrase a list of tokens"""
+    phrases = [tokenize(phrase) for phrase in PHRASE_PATTERN.findall(query)]
+    terms = tokenize(PHRASE_PATTERN.sub(' ', query))
+    return terms, [phrase for phrase in phrases if phrase]
+
+
+_OFFSET_MASK = np.uint64(0xFFFFFFFF)
+
+
+class SearchIndex:
+    """Token -> sorted entry positions and word occurrences index of one journal"""
+
+    def __init__(self, tokenize):
+        self.tokenize = tokenize
+        self._postings = {}
+        self._occurrences = {}
+        self._indexed = 0
+        self._generation = None
+
+    def __len__(self):
+        return self._indexed
+
+    def refresh(self, journal):
+        """Bring the index up to date with the journal"""
+        if journal.generation != self._generation:
+            self._postings = {}
+            self._occurrences = {}
+            self._indexed = 0
+            self._generation = journal.generation
+        texts = journal.texts()
+        postings = self._postings
+        occurrences = self._occurrences
+        for position in range(self._indexed, len(texts)):
+            base = position << 32
+            for offset, token in enumerate(self.tokenize(texts[position])):
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = array('I')
+                    occurrences[token] = array('Q')
+                if not posting or posting[-1] != position:
+                    posting.append(position)
+                occurrences[token].append(base | offset)
+        self._indexed = len(texts)
+
+    def searchable(self, query):
+        """Whether a query has any word the index can look up"""
+        terms, phrases = parse_query(query, self.tokenize)
+        return bool(terms or phrases)
+
+    def _posting(self, token):
+        posting = self._postings.get(token)
+        if posting is None:
+            return np.empty(0, dtype=np.uint32)
+        return np.frombuffer(posting, dtype=np.uint32)
+
+    def _phrase_positions(self, phrase):
+        """Sorted positions of the entries in which the phrase's tokens follow each other"""
+        starts = None
+        for shift, token in enumerate(phrase):
+            occurrences = self._occurrences.get(token)
+            if occurrences is None:
+                return np.empty(0, dtype=np.uint32)
+            occurrences = np.frombuffer(occurrences, dtype=np.uint64)
+            # Where the phrase would start if this is its word number `shift`
+            shifted = occurrences[(occurrences & _OFFSET_MASK) >= shift] - np.uint64(shift)
+            starts = shifted if starts is None else np.intersect1d(starts, shifted, assume_unique=True)
+            if not len(starts):
+                break
+        return np.unique(starts >> np.uint64(32)).astype(np.uint32)
+
+    def search(self, journal, query='', start=None, end=None, emotions=None):
+        """Positions of matching entries, newest first; every token and phrase must match.
+        A query with text but no searchable word matches nothing."""
+        self.refresh(journal)
+        terms, phrases = parse_query(query, self.tokenize)
+        tokens = set(terms).union(*phrases)
+        if query.strip() and not tokens:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = None
+        if tokens:
+            for posting in sorted((self._posting(token) for token in tokens), key=len):
+                candidates = posting if candidates is None else np.intersect1d(
+                    candidates, posting, assume_unique=True
+                )
+                if not len(candidates):
+                    break
+
+        for phrase in phrases:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, self._phrase_positions(phrase), assume_unique=True)
+
+        positions = journal.select(candidates, start, end, emotions)
+        return positions[::-1]
@@ -0,0 +1,190 @@
+"""SQLite persistence for MoodLens journals.
+
+Every saved entry is written as one row together with its sentiment scores
+and keywords, so a session can rebuild its Journal without re-analysing
+anything. Scores get their own REAL columns and keywords are stored as a
+comma-joined string (the tokenizer never produces commas), which keeps a
+full reload to a single indexed scan with no JSON parsing.
+
+Entries saved before their analysis has finished are stored with pending=1
+and placeholder scores, hidden from loads until complete() fills them in.
+Rows whose analysis raised are set to pending=2 by fail() so that later
+sessions stop re-queueing them; their text stays in the table.
+
+One store serves every session of the server process. Reads take a
+connection from a small pool and run concurrently under WAL; writes are
+serialized in-process so they never wait on SQLite's busy handler.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = os.environ.get('MOODLENS_DB', 'moodlens.db')
+DEFAULT_POOL_SIZE = int(os.environ.get('MOODLENS_DB_POOL_SIZE', '8'))
+
+# Milliseconds a connection waits for another process's write before failing
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    text TEXT NOT NULL,
+    compound REAL NOT NULL,
+    pos REAL NOT NULL,
+    neu REAL NOT NULL,
+    neg REAL NOT NULL,
+    emotion TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0
+);
+DROP INDEX IF EXISTS entries_user;
+CREATE INDEX IF NOT EXISTS entries_user_time ON entries (user_id, timestamp);
+"""
+
+
+def _entry_row(user_id, entry):
+    sentiment = entry['sentiment']
+    return (
+        user_id,
+        entry['timestamp'],
+        entry['date'],
+        entry['text'],
+        sentiment['compound'],
+        sentiment['pos'],
+        sentiment['neu'],
+        sentiment['neg'],
+        sentiment['emotion'],
+        ','.join(entry['keywords'])
+    )
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by all threads of the process"""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Safe under WAL: a power loss can drop the last commits but never corrupts the file
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, opening a new one only while fewer than size exist"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class JournalStore:
+    """Thread-safe SQLite store of journal entries partitioned by user id"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self._pool = ConnectionPool(path, pool_size)
+        self._write_lock = threading.Lock()
+        with self._write_lock, self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(entries)')]
+            if 'pending' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN pending INTEGER NOT NULL DEFAULT 0')
+
+    def close(self):
+        self._pool.close()
+
+    def add(self, user_id, entry):
+        """Persist one entry"""
+        self.add_many(user_id, [entry])
+
+    def add_many(self, user_id, entries):
+        """Persist several entries in a single transaction"""
+        rows = [_entry_row(user_id, entry) for entry in entries]
+        with self._write_lock, self._pool.connection() as conn, conn:
+            conn.executemany(
+                'INSERT INTO entries (user_id, timestamp, date, text, compound, pos, neu, neg, emotion, keywords) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def add_pending(self, user_id, entry):
+        """Persist an entry whose analysis is still running and return its row id for complete()"""
+        with self._write_lock, self._pool.connection() as conn, conn:
+            return conn.execute(
+                'INSERT INTO entries (user_id, timestamp, date, text, compound, pos, neu, neg, emotion, keywords, pending) '
+                "VALUES (?, ?, ?, ?, 0, 0, 1, 0, '', '', 1)",
+                (user_id, entry['timestamp'], entry['date'], entry['text'])
+            ).lastrowid
+
+    def complete(self, row_id, entry):
+        """Store the finished analysis of a pending entry"""
+        sentiment = entry['sentiment']
+        with self._write_lock, self._pool.connection() as conn, conn:
+            conn.execute(
+                'UPDATE entries SET compound = ?, pos = ?, neu = ?, neg = ?, emotion = ?, keywords = ?, pending = 0 '
+                'WHERE id = ?',
+                (
+                    sentiment['compound'],
+                    sentiment['pos'],
+                    sentiment['neu'],
+                    sentiment['neg'],
+                    sentiment['emotion'],
+                    ','.join(entry['keywords']),
+                    row_id
+                )
+            )
+
+    def fail(self, row_id):
+        """Take a pending entry whose analysis raised out of the queue for good"""
+        with self._write_lock, self._pool.connection() as conn, conn:
+            conn.execute('UPDATE entries SET pending = 2 WHERE id = ? AND pending = 1', (row_id,))
+
+    def load_pending(self, user_id):
+        """(row id, timestamp, text) of one user's entries still waiting for analysis, oldest first"""
+        with self._pool.connection() as conn:
+            return conn.execute(
+                'SELECT id, timestamp, text FROM entries WHERE user_id = ? AND pending = 1 ORDER BY timestamp, id',
+                (user_id,)
+            ).fetchall()
+
+    def load_rows(self, user_id):
+        """All analyzed entries of one user, oldest first, as flat tuples for Journal.from_rows"""
+        with self._pool.connection() as conn:
+            return conn.execute(
+                'SELECT timestamp, text, compound, pos, neu, neg, emotion, keywords '
+                'FROM entries WHERE user_id = ? AND pending = 0 ORDER BY timestamp, id',
+                (user_id,)
+            ).fetchall()
+
+    def clear(self, user_id):
+        """Delete every entry of one user"""
+        with self._write_lock, self._pool.connection() as conn, conn:
+            conn.execute('DELETE FROM entries WHERE user_id = ?', (user_id,))
@@ -0,0 +1,227 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from journal import Journal, StreakTracker
+
+START = date(2024, 3, 1)
+
+
+def entry(timestamp, compound=0.5, emotion='Positive', text='An entry', keywords=()):
+    return {
+        'timestamp': timestamp,
+        'date': timestamp[:10],
+        'text': text,
+        'sentiment': {'compound': compound, 'pos': 0.5, 'neu': 0.5, 'neg': 0.0, 'emotion': emotion},
+        'keywords': list(keywords)
+    }
+
+
+def on_day(day, compound=0.5, hour=9):
+    """Entry written `day` days after START"""
+    return entry(f'{START + timedelta(days=day)} {hour:02d}:00:00', compound)
+
+
+def today(day):
+    return START + timedelta(days=day)
+
+
+def reference_streaks(entries, today_date, threshold=0.05):
+    """Streaks counted the slow, obvious way"""
+    by_day = {}
+    for e in entries:
+        by_day.setdefault(date.fromisoformat(e['date']), []).append(e['sentiment']['compound'])
+    days = sorted(by_day)
+    positive = {day for day in days if sum(by_day[day]) / len(by_day[day]) > threshold}
+
+    def runs(selected):
+        longest = current = 0
+        previous = None
+        for day in days:
+            if day not in selected:
+                current, previous = 0, None
+                continue
+            current = current + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+            previous = day
+            longest = max(longest, current)
+        return longest
+
+    def current_run(selected):
+        if not days or days[-1] < today_date - timedelta(days=1) or days[-1] not in selected:
+            return 0
+        length, day = 0, days[-1]
+        while day in selected:
+            length += 1
+            day -= timedelta(days=1)
+        return length
+
+    return {
+        'current_journaling': current_run(set(days)),
+        'longest_journaling': runs(set(days)),
+        'current_positive': current_run(positive),
+        'longest_positive': runs(positive)
+    }
+
+
+def test_unknown_emotion_label_is_refused():
+    journal = Journal([entry('2024-03-01 09:00:00')])
+    with pytest.raises(ValueError):
+        journal.add(entry('2024-03-02 09:00:00', emotion='Mood0'))
+    assert len(journal) == 1
+    journal.add(entry('2024-03-02 09:00:00'))
+    assert [e['timestamp'] for e in journal] == ['2024-03-02 09:00:00', '2024-03-01 09:00:00']
+
+
+def test_frame_carries_the_stored_emotion():
+    journal = Journal()
+    journal.merge([
+        entry('2024-03-02 09:00:00', 0.9, 'Very Positive'),
+        entry('2024-03-01 09:00:00', -0.3, 'Negative')
+    ])
+    assert journal.frame()['emotion'].tolist() == ['Negative', 'Very Positive']
+    assert journal.frame(start='2024-03-02')['emotion'].tolist() == ['Very Positive']
+
+
+def test_current_and_longest_streaks():
+    journal = Journal()
+    journal.extend([on_day(day) for day in (0, 1, 2, 5, 6)])
+    assert journal.streaks(today(6)) == {
+        'current_journaling': 2,
+        'longest_journaling': 3,
+        'current_positive': 2,
+        'longest_positive': 3
+    }
+
+
+def test_negative_day_breaks_only_the_positive_streak():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(1), on_day(2, -0.6), on_day(3), on_day(4)])
+    streaks = journal.streaks(today(4))
+    assert streaks['current_journaling'] == streaks['longest_journaling'] == 5
+    assert streaks['current_positive'] == 2
+    assert streaks['longest_positive'] == 2
+
+
+def test_several_entries_on_one_day_count_once_by_their_mean():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(1, 0.9, hour=8), on_day(1, -0.5, hour=20), on_day(2)])
+    assert journal.streaks(today(2))['current_journaling'] == 3
+    assert journal.streaks(today(2))['current_positive'] == 3
+
+    # A later entry on the same day can turn the day negative
+    journal.add(on_day(2, -0.9, hour=22))
+    streaks = journal.streaks(today(2))
+    assert streaks['current_journaling'] == 3
+    assert streaks['current_positive'] == 0
+    assert streaks['longest_positive'] == 2
+
+
+def test_current_streaks_lapse_after_a_missed_day():
+    journal = Journal()
+    journal.extend([on_day(day) for day in range(4)])
+    assert journal.streaks(today(3))['current_journaling'] == 4
+    assert journal.streaks(today(4))['current_journaling'] == 4
+    lapsed = journal.streaks(today(5))
+    assert lapsed['current_journaling'] == lapsed['current_positive'] == 0
+    assert lapsed['longest_journaling'] == lapsed['longest_positive'] == 4
+
+
+def test_back_dated_entry_rebuilds_the_streaks():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(1), on_day(3), on_day(4)])
+    assert journal.streaks(today(4))['current_journaling'] == 2
+
+    journal.add(on_day(2))
+    assert journal.streaks(today(4))['current_journaling'] == 5
+    # Appends after the rebuild are counted incrementally again
+    journal.add(on_day(5))
+    assert journal.streaks(today(5))['longest_journaling'] == 6
+
+
+def test_tracker_refuses_an_earlier_day():
+    tracker = StreakTracker()
+    assert tracker.add(10, 0.5)
+    assert not tracker.add(9, 0.5)
+    assert tracker.streaks()['current_journaling'] == 1
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streaks_match_a_brute_force_count(seed):
+    rng = random.Random(seed)
+    entries = [
+        on_day(rng.randint(0, 30), rng.choice((-0.6, 0.0, 0.3, 0.8)), hour=rng.randint(0, 23))
+        for _ in range(rng.randint(1, 60))
+    ]
+    incremental = Journal()
+    for e in entries:
+        incremental.merge([e])
+    bulk = Journal(sorted(entries, key=lambda e: e['timestamp'], reverse=True))
+    for day in (29, 30, 31, 32):
+        expected = reference_streaks(entries, today(day))
+        assert incremental.streaks(today(day)) == expected
+        assert bulk.streaks(today(day)) == expected
+
+
+def test_window_sums_the_days_in_range():
+    journal = Journal()
+    journal.extend([on_day(0, 0.4), on_day(2, 0.8, hour=8), on_day(2, -0.2, hour=20), on_day(5, -0.6)])
+    totals = journal.daily_totals()
+
+    count, sums, positives = totals.window(today(1), today(2))
+    assert (count, positives) == (2, 1)
+    assert sums[0] == pytest.approx(0.6)
+    assert totals.window(today(0), today(0))[0] == 1
+    assert totals.window()[0] == 4
+    assert totals.window(start=today(2))[0] == 3
+    assert totals.window(end=today(1))[0] == 1
+
+
+def test_window_without_entries_is_empty():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(5)])
+    totals = journal.daily_totals()
+    for start, end in ((today(1), today(4)), (today(6), today(9)), (today(3), today(1))):
+        count, sums, positives = totals.window(start, end)
+        assert (count, positives) == (0, 0)
+        assert not sums.any()
+    assert Journal().daily_totals().window(today(0), today(1))[0] == 0
+    assert journal.stats(today(1), today(4))['positive_ratio'] == 0.0
+
+
+def test_window_accepts_date_strings():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(1)])
+    assert journal.daily_totals().window(str(today(1)), str(today(1)))[0] == 1
+
+
+def test_daily_totals_follow_journal_changes():
+    journal = Journal()
+    journal.extend([on_day(0), on_day(3)])
+    assert journal.daily_totals().window(today(0), today(3))[0] == 2
+    journal.add(on_day(1))
+    assert journal.daily_totals().window(today(0), today(3))[0] == 3
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_window_stats_match_filtering_the_entries(seed):
+    rng = random.Random(seed)
+    entries = [
+        on_day(rng.randint(0, 30), rng.choice((-0.6, 0.0, 0.3, 0.8)), hour=rng.randint(0, 23))
+        for _ in range(rng.randint(1, 60))
+    ]
+    journal = Journal()
+    journal.merge(entries)
+    for _ in range(10):
+        start, end = sorted(today(rng.randint(-2, 32)) for _ in range(2))
+        selected = [
+            e['sentiment']['compound'] for e in entries
+            if start <= date.fromisoformat(e['date']) <= end
+        ]
+        stats = journal.stats(start, end)
+        assert stats['count'] == len(selected)
+        if selected:
+            assert stats['avg_compound'] == pytest.approx(sum(selected) / len(selected))
+            assert stats['positive_ratio'] == pytest.approx(
+                sum(c > 0.05 for c in selected) / len(selected)
+            )
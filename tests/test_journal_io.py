@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+
+import pytest
+
+from analysis import classify_emotions
+from journal import Journal
+from journal_io import CSV_COLUMNS, JournalImport, normalize_record, write_export
+
+SCORES = {'compound': 0.5, 'pos': 0.4, 'neu': 0.6, 'neg': 0.0, 'emotion': 'Positive'}
+
+
+def json_record(**fields):
+    record = {'timestamp': '2024-03-01 09:30:00', 'text': 'A calm morning walk', 'sentiment': dict(SCORES), 'keywords': ['calm', 'walk']}
+    record.update(fields)
+    return record
+
+
+def csv_file(*rows):
+    header = ','.join(CSV_COLUMNS) + '\n'
+    return io.BytesIO((header + ''.join(row + '\n' for row in rows)).encode('utf-8'))
+
+
+def run_import(fileobj):
+    job = JournalImport(
+        fileobj,
+        lambda texts: [dict(SCORES) for _ in texts],
+        lambda texts: [['keyword'] for _ in texts],
+        classify_emotions
+    )
+    return job, [entry for batch in job.batches() for entry in batch]
+
+
+@pytest.mark.parametrize('timestamp, expected', [
+    ('2024-03-01 09:30:00', '2024-03-01 09:30:00'),
+    ('  2024-03-01 09:30:00 ', '2024-03-01 09:30:00'),
+    ('2024-03-01T09:30', '2024-03-01 09:30:00'),
+    ('2024-03-01', '2024-03-01 00:00:00'),
+    ('9999-12-31 23:59:59', '9999-12-31 23:59:59')
+])
+def test_timestamps_are_normalized(timestamp, expected):
+    entry = normalize_record(json_record(timestamp=timestamp))
+    assert entry['timestamp'] == expected
+    assert entry['date'] == expected[:10]
+
+
+@pytest.mark.parametrize('timestamp', ['', '   ', 'NaT', 'yesterday', '2024-13-01 00:00:00', '99999-01-01', '0999-12-31', None, 20240301])
+def test_unusable_timestamps_are_rejected(timestamp):
+    assert normalize_record(json_record(timestamp=timestamp)) is None
+
+
+@pytest.mark.parametrize('text', ['', '   ', None, 42])
+def test_unusable_text_is_rejected(text):
+    assert normalize_record(json_record(text=text)) is None
+
+
+def test_stored_analysis_is_kept():
+    entry = normalize_record(json_record())
+    assert entry['sentiment'] == SCORES
+    assert entry['keywords'] == ['calm', 'walk']
+
+
+@pytest.mark.parametrize('sentiment', [
+    {'compound': 1.5, 'pos': 0.4, 'neu': 0.6, 'neg': 0.0},
+    {'compound': 0.5, 'pos': -0.1, 'neu': 0.6, 'neg': 0.0},
+    {'compound': 'high', 'pos': 0.4, 'neu': 0.6, 'neg': 0.0},
+    {'compound': 0.5, 'pos': 0.4, 'neu': 0.6}
+])
+def test_invalid_scores_need_rescoring(sentiment):
+    assert normalize_record(json_record(sentiment=sentiment))['sentiment'] is None
+
+
+def test_missing_emotion_and_keywords_are_marked():
+    scores = {field: value for field, value in SCORES.items() if field != 'emotion'}
+    entry = normalize_record(json_record(sentiment=scores, keywords=[1, 2]))
+    assert entry['sentiment']['emotion'] is None
+    assert entry['keywords'] is None
+
+
+def test_csv_row_is_parsed():
+    entry = normalize_record({
+        'Timestamp': '2024-03-01 09:30:00', 'Text': 'Busy day', 'Emotion': 'Neutral',
+        'Sentiment_Score': '0.0', 'Positive': '0.2', 'Neutral': '0.6', 'Negative': '0.2', 'Keywords': 'busy, day'
+    })
+    assert entry['sentiment'] == {'compound': 0.0, 'pos': 0.2, 'neu': 0.6, 'neg': 0.2, 'emotion': 'Neutral'}
+    assert entry['keywords'] == ['busy', 'day']
+
+
+def test_blank_csv_timestamp_counts_as_invalid():
+    job, entries = run_import(csv_file(
+        ',No time at all,Neutral,0.0,0.0,1.0,0.0,',
+        'NaT,Not a time either,Neutral,0.0,0.0,1.0,0.0,',
+        '2024-03-01 09:30:00,A good day,Positive,0.5,0.4,0.6,0.0,good'
+    ))
+    assert [entry['text'] for entry in entries] == ['A good day']
+    assert (job.read, job.imported, job.invalid) == (3, 1, 2)
+
+
+def test_import_rescores_and_skips_duplicates():
+    lines = [
+        json.dumps(json_record()),
+        json.dumps(json_record()),
+        json.dumps(json_record(text='No scores here', sentiment=None, keywords=None))
+    ]
+    job, entries = run_import(io.BytesIO('\n'.join(lines).encode('utf-8')))
+    assert [entry['text'] for entry in entries] == ['A calm morning walk', 'No scores here']
+    assert entries[1]['sentiment'] == SCORES
+    assert entries[1]['keywords'] == ['keyword']
+    assert (job.duplicates, job.rescored, job.invalid) == (1, 1, 0)
+
+
+def test_unknown_emotion_labels_are_derived_from_the_score():
+    sentiment = dict(SCORES, emotion='Mood7')
+    assert normalize_record(json_record(sentiment=sentiment))['sentiment']['emotion'] is None
+    assert normalize_record(json_record())['sentiment']['emotion'] == 'Positive'
+
+
+def test_made_up_emotion_labels_import_into_a_journal():
+    lines = [
+        json.dumps(json_record(text=f'Entry {i}', sentiment=dict(SCORES, emotion=f'Mood{i}')))
+        for i in range(300)
+    ]
+    job, entries = run_import(io.BytesIO('\n'.join(lines).encode('utf-8')))
+    assert {entry['sentiment']['emotion'] for entry in entries} == {'Positive'}
+
+    journal = Journal()
+    journal.merge(entries)
+    assert len(journal) == 300
+    assert journal[0]['sentiment']['emotion'] == 'Positive'
+
+
+def test_import_relabels_emotions_from_the_score():
+    lines = [
+        json.dumps(json_record(sentiment=dict(SCORES, emotion='Very Negative'))),
+        json.dumps(json_record(text='Awful day', sentiment=dict(SCORES, compound=-0.9, emotion='Positive')))
+    ]
+    job, entries = run_import(io.BytesIO('\n'.join(lines).encode('utf-8')))
+    assert [entry['sentiment']['emotion'] for entry in entries] == ['Positive', 'Very Negative']
+    assert all(type(entry['sentiment']['emotion']) is str for entry in entries)
+
+
+def exported_emotions(journal, fmt):
+    buffer = io.BytesIO()
+    write_export(journal, buffer, fmt)
+    text = buffer.getvalue().decode('utf-8')
+    if fmt == 'csv':
+        return [row['Emotion'] for row in csv.DictReader(io.StringIO(text))]
+    if fmt == 'jsonl':
+        return [json.loads(line)['sentiment']['emotion'] for line in text.splitlines()]
+    return [entry['sentiment']['emotion'] for entry in json.loads(text)['entries']]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'json', 'jsonl'])
+def test_exports_write_the_stored_emotion(fmt):
+    journal = Journal()
+    journal.merge([
+        normalize_record(json_record(sentiment=dict(SCORES, emotion='Very Positive'))),
+        normalize_record(json_record(text='Later', timestamp='2024-03-02 09:30:00'))
+    ])
+    assert exported_emotions(journal, fmt) == ['Positive', 'Very Positive']
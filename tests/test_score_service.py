@@ -0,0 +1,42 @@
+import io
+import json
+import uuid
+
+import pytest
+
+import analysis
+import score_service
+
+pytestmark = pytest.mark.skipif(not analysis.VADER_AVAILABLE, reason='needs vaderSentiment')
+
+
+def test_default_batches_reach_the_process_pool(monkeypatch):
+    pools = []
+
+    class RecordingPool(analysis.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(kwargs['max_workers'])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(analysis, 'ProcessPoolExecutor', RecordingPool)
+    # Unique lines so the process-wide analysis cache cannot answer them
+    run = uuid.uuid4().hex
+    lines = [f'Entry {i} of run {run} was a good day\n' for i in range(score_service.DEFAULT_BATCH_SIZE)]
+    output = io.StringIO()
+
+    count = score_service.score_stream(io.StringIO(''.join(lines)), output, workers=2)
+
+    assert count == len(lines)
+    assert pools == [2]
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0]['text'] == lines[0].rstrip('\n')
+    assert records[0]['sentiment'] == analysis.score_text(analysis.get_analyzer()[0], records[0]['text'])
+
+
+def test_single_worker_scores_in_process(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError('no process pool expected')
+
+    monkeypatch.setattr(analysis, 'ProcessPoolExecutor', refuse)
+    lines = [f'Quiet evening number {i} {uuid.uuid4().hex}\n' for i in range(score_service.DEFAULT_BATCH_SIZE)]
+    assert score_service.score_stream(io.StringIO(''.join(lines)), io.StringIO(), workers=1) == len(lines)
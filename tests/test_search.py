@@ -0,0 +1,95 @@
+import pytest
+
+from analysis import DEFAULT_KEYWORD_EXTRACTOR
+from journal import Journal
+from search import SearchIndex, parse_query
+
+TEXTS = [
+    'A long walk in the park with my sister',
+    'Rainy day, stayed in and read about the park rangers',
+    'Walk the dog, then park the car',
+    'Deadline stress at work again',
+    'Another walk in the park, calmer this time'
+]
+
+
+def entry(day, text, emotion='Positive'):
+    return {
+        'timestamp': f'2024-03-{day:02d} 09:00:00',
+        'date': f'2024-03-{day:02d}',
+        'text': text,
+        'sentiment': {'compound': 0.5, 'pos': 0.5, 'neu': 0.5, 'neg': 0.0, 'emotion': emotion},
+        'keywords': []
+    }
+
+
+def make_journal(*entries):
+    """Journal of entries given oldest first"""
+    return Journal(list(entries)[::-1])
+
+
+@pytest.fixture
+def journal():
+    return make_journal(*(entry(day, text) for day, text in enumerate(TEXTS, 1)))
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(DEFAULT_KEYWORD_EXTRACTOR.tokenize)
+
+
+def texts_of(journal, positions):
+    return [journal.texts()[position] for position in positions]
+
+
+def test_parse_query_splits_terms_and_phrases():
+    terms, phrases = parse_query('park "walk in the" dog ""', DEFAULT_KEYWORD_EXTRACTOR.tokenize)
+    assert terms == ['park', 'dog']
+    assert phrases == [['walk', 'in', 'the']]
+
+
+def test_keywords_must_all_match_newest_first(index, journal):
+    assert texts_of(journal, index.search(journal, 'walk park')) == [TEXTS[4], TEXTS[2], TEXTS[0]]
+
+
+def test_phrase_needs_adjacent_words(index, journal):
+    assert texts_of(journal, index.search(journal, '"walk in the park"')) == [TEXTS[4], TEXTS[0]]
+    assert texts_of(journal, index.search(journal, '"the park"')) == [TEXTS[4], TEXTS[1], TEXTS[0]]
+    assert list(index.search(journal, '"park walk"')) == []
+
+
+def test_phrase_with_repeated_word(index):
+    journal = make_journal(entry(1, 'so very very tired'), entry(2, 'very tired, very happy'))
+    assert texts_of(journal, index.search(journal, '"very very"')) == ['so very very tired']
+
+
+def test_query_without_searchable_words_matches_nothing(index, journal):
+    for query in ('2023', '!!!', '"123"'):
+        assert not index.searchable(query)
+        assert list(index.search(journal, query)) == []
+    assert index.searchable('park 2023')
+
+
+def test_empty_query_applies_only_the_filters(index, journal):
+    assert len(index.search(journal, '')) == len(TEXTS)
+    assert texts_of(journal, index.search(journal, '', start='2024-03-04')) == [TEXTS[4], TEXTS[3]]
+
+
+def test_emotion_filter(index):
+    journal = make_journal(entry(1, 'park day', 'Positive'), entry(2, 'park night', 'Negative'))
+    assert texts_of(journal, index.search(journal, 'park', emotions=['Negative'])) == ['park night']
+
+
+def test_appended_entries_are_indexed_incrementally(index, journal):
+    index.search(journal, 'park')
+    journal.add(entry(6, 'Evening walk in the park'))
+    assert len(index.search(journal, '"walk in the park"')) == 3
+    assert len(index) == len(TEXTS) + 1
+
+
+def test_renumbering_rebuilds_the_index(index, journal):
+    index.search(journal, 'park')
+    journal.merge([{**entry(1, 'Back-dated walk in the park'), 'timestamp': '2024-02-28 09:00:00'}])
+    assert texts_of(journal, index.search(journal, '"walk in the park"')) == [
+        TEXTS[4], TEXTS[0], 'Back-dated walk in the park'
+    ]